@@ -1,18 +1,16 @@
-from framework_led_matrix.core.led_commands import log, draw_greyscale_on_board, set_led, clear_graph, start_animation, stop_animation, draw_matrix_on_board, reset_modules, WIDTH, HEIGHT, coordinates_to_matrix
+from framework_led_matrix.core.led_commands import log, draw_greyscale_on_board, clear_graph, start_animation, stop_animation, draw_matrix_on_board, reset_modules, WIDTH, HEIGHT, coordinates_to_matrix
 from framework_led_matrix.simulations.BihamMiddletonLevineTrafficModel import run_bml
-from framework_led_matrix.utils.anagrams import draw_anagram_on_matrix, anagrams, ensure_nltk_words
-# Note: 'words' corpus is imported inside anagrams.py or needs to be available
+from framework_led_matrix.utils.anagrams import draw_anagram_on_matrix, anagrams, words_up_to_length
 from framework_led_matrix.utils.text_rendering import draw_text_vertical
 from framework_led_matrix.core.math_engine import MATH_OPERATIONS, pick_largest_graph
 from framework_led_matrix.simulations.inner_totalistic import run_totalistic_ca
-from framework_led_matrix.simulations.outer_totalistic import run_outer_totalistic_ca, game_of_life_rules, STARTING_STATES_GOF
+from framework_led_matrix.simulations.outer_totalistic import make_rule_tables, step_outer_totalistic, game_of_life_rules, STARTING_STATES_GOF
 from typing import List, Optional
 from framework_led_matrix.simulations.HardyPomeauPazzis import run_hpp_simulation, create_hpp_board_np
+from framework_led_matrix.utils.frame_pipeline import RedrawGate
 import random
 import time
 import numpy as np
-import nltk
-from nltk.corpus import words
 
 
 def run_hpp_with_math(density: float = 0.3, timesteps: int = 500, delay_sec: float = 0.1, graphs_count: int = 5):
@@ -30,6 +28,21 @@ def run_hpp_with_math(density: float = 0.3, timesteps: int = 500, delay_sec: flo
             which='both'
         )
 
+def _wait_for_next_frame(next_frame: float, delay_sec: float) -> float:
+    """
+    Sleeps until delay_sec after the frame that was due at 'next_frame' and
+    returns the new due time (a time.perf_counter() value).
+
+    Frames are paced from a fixed schedule, so time spent stepping and
+    drawing comes out of the sleep instead of adding to it. If a slow draw
+    overran the deadline, the schedule restarts from now rather than
+    rushing the following frames to catch up.
+    """
+    now = time.perf_counter()
+    next_frame = max(next_frame + delay_sec, now)
+    time.sleep(next_frame - now)
+    return next_frame
+
 def run_outer_totalistic_simulation(initial_state: Optional[List[List[int]]] = None, b_rule: Optional[List[int]] = None, s_rule: Optional[List[int]] = None, timesteps: int = 100, delay_sec: float = 0.1, oscilation_max_steps: int = 20, still_board_max_steps: int = 10, empty_board_max_steps: int = 5):
     # normalize defaults to avoid mutable default arguments and satisfy type annotations
     if b_rule is None:
@@ -37,19 +50,28 @@ def run_outer_totalistic_simulation(initial_state: Optional[List[List[int]]] = N
     if s_rule is None:
         s_rule = [2,3]
 
-    initial_state_np = np.random.randint(0, 2, size=(HEIGHT, WIDTH), dtype=int) if initial_state is None else np.array(initial_state, dtype=int)
+    initial_state_np = np.random.randint(0, 2, size=(HEIGHT, WIDTH), dtype=np.uint8) if initial_state is None else (np.asarray(initial_state) == 1).astype(np.uint8)
     log(f"Running Outer-Totalistic CA: B{b_rule}/S{s_rule} for {timesteps} steps.")
-    all_generations = run_outer_totalistic_ca(initial_state_np, timesteps, b_rule, s_rule)
+    birth, survive = make_rule_tables(b_rule, s_rule)
+    # Three rotating buffers: the current generation and the two before it
+    frame_np = initial_state_np
+    prev_np = np.empty_like(frame_np)
+    two_ago_np = np.empty_like(frame_np)
     oscilation_counter = 0
     still_board_counter = 0
     empty_board_counter = 0
-    for t in range(all_generations.shape[0]):
-        frame_np = all_generations[t] 
-        frame_list = frame_np.tolist()
-        draw_matrix_on_board(frame_list, which='both')
-        time.sleep(delay_sec)
+    redraw = RedrawGate()
+    next_frame = time.perf_counter()
+    for t in range(max(timesteps, 1)):
+        if t > 0:
+            # the oldest buffer receives the next generation
+            two_ago_np, prev_np, frame_np = prev_np, frame_np, two_ago_np
+            step_outer_totalistic(prev_np, frame_np, birth, survive)
+        if redraw.needs_draw(frame_np):
+            draw_matrix_on_board(frame_np, which='both')
+        next_frame = _wait_for_next_frame(next_frame, delay_sec)
         #oscilation
-        if all_generations[t].tolist() == all_generations[t-2].tolist() and t >=2:
+        if t >= 2 and np.array_equal(frame_np, two_ago_np):
             oscilation_counter +=1
             if oscilation_counter >= oscilation_max_steps:
                 log(f"oscillation at step {t-oscilation_max_steps}. Ending simulation.")
@@ -57,8 +79,10 @@ def run_outer_totalistic_simulation(initial_state: Optional[List[List[int]]] = N
         else:
             oscilation_counter = 0
 
+        board_empty = not frame_np.any()
+
         # still life
-        if np.all(frame_np == 0):
+        if board_empty:
             still_board_counter += 1
             if still_board_counter >= still_board_max_steps:
                 log(f"still life detected at step {t-still_board_max_steps}. Ending simulation.")
@@ -67,7 +91,7 @@ def run_outer_totalistic_simulation(initial_state: Optional[List[List[int]]] = N
             still_board_counter = 0
 
         # empty board
-        if np.all(frame_np == 0):
+        if board_empty:
             empty_board_counter += 1
             if empty_board_counter >= empty_board_max_steps:
                 log(f"empty board detected at step {t-empty_board_max_steps}. Ending simulation.")
@@ -76,11 +100,11 @@ def run_outer_totalistic_simulation(initial_state: Optional[List[List[int]]] = N
             empty_board_counter = 0
 
 
-def game_of_life_totalistic_sim(initial_board: Optional[List[List[int]]] = None, generations: int = 200, delay_sec: float = 0.1, which: str = 'both'):
-    initial_state_np = np.array(initial_board, dtype=int) if initial_board is not None else np.random.randint(0, 2, size=(HEIGHT, WIDTH), dtype=int)
+def game_of_life_totalistic_sim(initial_board: Optional[List[List[int]] | np.ndarray] = None, generations: int = 200, delay_sec: float = 0.1, which: str = 'both'):
     b_rule = game_of_life_rules['Original']['B']
     s_rule = game_of_life_rules['Original']['S']
-    run_outer_totalistic_simulation(initial_state_np.tolist(), b_rule, s_rule, generations, delay_sec)
+    # None seeds a random board inside run_outer_totalistic_simulation
+    run_outer_totalistic_simulation(initial_board, b_rule, s_rule, generations, delay_sec)
         
 
 def run_bml_simulation(density: float = 0.3, timesteps: int = 100, delay_sec: float = 0.1):
@@ -92,19 +116,33 @@ def run_inner_totalistic_simulation(initial_state: Optional[List[List[int]]] = N
     all_generations = run_totalistic_ca(initial_state_np, timesteps, rule_number)
 
     try:
-        for t in range(all_generations.shape[0]):
-            frame_np = all_generations[t]
-            frame_list = frame_np.tolist()
-            draw_matrix_on_board(frame_list, which='both')
-            time.sleep(delay_sec)
+        redraw = RedrawGate()
+        next_frame = time.perf_counter()
+        for frame_np in all_generations:
+            if redraw.needs_draw(frame_np):
+                draw_matrix_on_board(frame_np, which='both')
+            next_frame = _wait_for_next_frame(next_frame, delay_sec)
 
     except KeyboardInterrupt:
         log("Animation stopped by user.")
         clear_graph()
 
+def _fill_triangular_brightness(rng: np.random.Generator, sample: np.ndarray, out: np.ndarray):
+    """
+    Fills 'out' (uint8) with brightness drawn from triangular(0, 0, 255),
+    like rng.triangular but in place, using 'sample' (float64, same shape)
+    as scratch. Inverts the CDF: x = 255 * (1 - sqrt(1 - u)).
+    """
+    rng.random(out=sample)
+    np.subtract(1.0, sample, out=sample)
+    np.sqrt(sample, out=sample)
+    np.subtract(1.0, sample, out=sample)
+    np.multiply(sample, 255.0, out=sample)
+    np.copyto(out, sample, casting='unsafe')
+
 def random_greyscale_animation(animate: bool = True, duration_seconds: int = 10):
     log(f"random_greyscale_animation: start animate={animate} duration_seconds={duration_seconds}")
-    matrix = [[0 for _ in range(WIDTH)] for _ in range(HEIGHT)]
+    rng = np.random.default_rng()
     if animate:
         log("random_greyscale_animation: starting hardware animation")
         start_animation()
@@ -112,19 +150,19 @@ def random_greyscale_animation(animate: bool = True, duration_seconds: int = 10)
         log("random_greyscale_animation: ensuring animation stopped")
         stop_animation()
 
-    timeout_start = time.time()
+    # Reused every frame: draw_greyscale_on_board has sent a frame before it returns
+    sample = np.empty((HEIGHT, WIDTH), dtype=np.float64)
+    matrix = np.empty((HEIGHT, WIDTH), dtype=np.uint8)
+    deadline = time.monotonic() + duration_seconds
     frames = 0
-    while time.time() < timeout_start + duration_seconds:
+    while time.monotonic() < deadline:
         frames += 1
-        # fill matrix with random brightness
-        for row in range(HEIGHT):
-            for col in range(WIDTH):
-                brightness = int(random.triangular(0, 255, 0))
-                set_led(matrix, row, col, brightness)
+        # fill matrix with random brightness, skewed towards dark
+        _fill_triangular_brightness(rng, sample, matrix)
         draw_greyscale_on_board(matrix, which='both')
         # log periodically to avoid overwhelming logs
         if frames % 20 == 0:
-            remaining = max(0, timeout_start + duration_seconds - time.time())
+            remaining = max(0, deadline - time.monotonic())
             log(f"random_greyscale_animation: frames={frames} time_remaining={remaining:.1f}s")
     log(f"random_greyscale_animation: completed frames={frames}")
     stop_animation()
@@ -133,8 +171,7 @@ def random_greyscale_animation(animate: bool = True, duration_seconds: int = 10)
 
 def run_anagrams_game_of_life(word_limit: int = 4, generations: int = 100, delay_sec: float = 0.1, which: str = 'both'):
     log("runtime.py: run_anagrams_game_of_life() entry")
-    ensure_nltk_words()
-    eligible_words = [word for word in words.words() if len(word) <= 7]
+    eligible_words = words_up_to_length(7)
     actual_limit = min(word_limit, len(eligible_words))
     for word in random.sample(eligible_words, actual_limit):
         ana_lst = anagrams(word)
@@ -147,13 +184,13 @@ def run_anagrams_game_of_life(word_limit: int = 4, generations: int = 100, delay
             start_animation()
             time.sleep(3)
             stop_animation()
-            draw_text_vertical(w, which=which)
+            # The animation scrolled the word away; put it back from the rendered matrix
+            draw_matrix_on_board(matrix, which=which)
             game_of_life_totalistic_sim(initial_board=matrix, generations=generations, delay_sec=delay_sec, which=which)
 
 def run_draw_anagram_on_matrix(word_limit: int = 3, which: str = 'both'):
     log("runtime.py: run_draw_anagram_on_matrix() entry")
-    ensure_nltk_words()
-    eligible_words = [word for word in words.words() if len(word) <= 7]
+    eligible_words = words_up_to_length(7)
     actual_limit = min(word_limit, len(eligible_words))
     for word in random.sample(eligible_words, actual_limit):
         draw_anagram_on_matrix(word, which=which, animate=True)
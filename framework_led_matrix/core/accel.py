@@ -0,0 +1,24 @@
+"""
+Optional Numba acceleration.
+
+If Numba is installed, `njit` and `prange` are Numba's and HAVE_NUMBA is True.
+Otherwise `njit` is a no-op decorator and `prange` is `range`, so kernels can
+still be defined at import time; callers should check HAVE_NUMBA and use their
+NumPy implementation instead of running the kernels as plain Python.
+"""
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that returns the function unchanged."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
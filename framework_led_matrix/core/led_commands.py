@@ -1,7 +1,10 @@
-import subprocess
+import atexit
+import os
 import re
 import serial
 import serial.tools.list_ports
+import numpy as np
+from types import MappingProxyType
 from typing import List, Optional, Tuple
 import sys
 
@@ -10,21 +13,40 @@ HEIGHT = 34
 verbose = True
 linux = bool(sys.platform == "linux")
 
+# USB vendor/product IDs of the Framework LED matrix module
+LED_MATRIX_VID = 0x32AC
+LED_MATRIX_PID = 0x0020
+
 class VerboseLogger:
+    """
+    Callable logger that prints only when 'verbose' is set.
+
+    Hot paths should use log.d("fmt %s", arg), which only formats the
+    message when logging is on. Guard with 'if log.verbose:' when even
+    computing the arguments is costly.
+    """
+    __slots__ = ('verbose',)
+
     def __init__(self, verbose=False):
         self.verbose = verbose
     def __call__(self, *args, **kwargs):
-        if self.verbose:
-            print(*args, **kwargs)
-
-def find_matching_ports_windows(target_description):
-    """Finds COM ports with descriptions containing the target_description."""
+        if not self.verbose:
+            return
+        print(*args, **kwargs)
+    def d(self, fmt, *args):
+        """Lazily %-formats and prints 'fmt' when verbose; otherwise does nothing."""
+        if not self.verbose:
+            return
+        print(fmt % args if args else fmt)
+
+def find_matching_ports_windows(vid=LED_MATRIX_VID, pid=LED_MATRIX_PID):
+    """Finds the COM ports of USB devices with the given vendor/product IDs."""
     matching_ports = {
         'left': '',
         'right': ''
     }
     for port in serial.tools.list_ports.comports():
-        if target_description in port.description:
+        if port.vid == vid and port.pid == pid:
             # Check the device name, not the description
             if port.device == 'COM3':
                 matching_ports['left'] = port.device
@@ -44,30 +66,32 @@ RIGHT_PCI_PATH_LINUX = 'pci-0000:c2:00.3-usb-0:3.3:1.0'
 LEFT_PCI_PATH_LINUX = 'pci-0000:c2:00.3-usb-0:4.2:1.0'
 RIGHT_PCI_PATH = RIGHT_PCI_PATH_LINUX if linux else RIGHT_PCI_PATH_WINDOWS
 LEFT_PCI_PATH = LEFT_PCI_PATH_LINUX if linux else LEFT_PCI_PATH_WINDOWS
+SERIAL_BY_PATH_DIR = '/dev/serial/by-path'
 
 DEFAULT_FONT_PATH = "/usr/share/fonts/TTF/DejaVuSansMono.ttf"
 
 # --- COMMAND CONSTANTS ---
-COMMANDS = {
+# Read-only lookup tables. Parameter values are bytes so they can be sent as-is.
+COMMANDS = MappingProxyType({
     "brightness": 0x00, "pattern": 0x01, "bootloader": 0x02, "sleep": 0x03,
     "animate": 0x04, "panic": 0x05, "drawbw": 0x06, "stagecol": 0x07,
     "flushcols": 0x08, "startgame": 0x10, "gamecontrol": 0x11,
     "getsleep": 0x03, "getanimate": 0x04, "gamestatus": 0x12, "version": 0x20
-}
-PATTERNS = {
-    "percentage": [0x00], "gradient": [0x01], "doublegradient": [0x02],
-    "lotush": [0x03], "zigzag": [0x04], "full": [0x05], "panic": [0x06], "lotusv": [0x07]
-}
-GAMES = { "snake": [0], "pong": [1] }
-GAME_CONTROLS = {
-    "pong": {
-        "far_player": {"left": [2], "right": [3]},
-        "close_player": {"left": [5], "right": [6]}, "stop": [4]
-    },
-    "snake": {
-        "up": [0], "down": [1], "left": [2], "right": [3], "stop": [4]
-    },
-}
+})
+PATTERNS = MappingProxyType({
+    "percentage": b"\x00", "gradient": b"\x01", "doublegradient": b"\x02",
+    "lotush": b"\x03", "zigzag": b"\x04", "full": b"\x05", "panic": b"\x06", "lotusv": b"\x07"
+})
+GAMES = MappingProxyType({ "snake": b"\x00", "pong": b"\x01" })
+GAME_CONTROLS = MappingProxyType({
+    "pong": MappingProxyType({
+        "far_player": MappingProxyType({"left": b"\x02", "right": b"\x03"}),
+        "close_player": MappingProxyType({"left": b"\x05", "right": b"\x06"}), "stop": b"\x04"
+    }),
+    "snake": MappingProxyType({
+        "up": b"\x00", "down": b"\x01", "left": b"\x02", "right": b"\x03", "stop": b"\x04"
+    }),
+})
 
 
 def get_module_paths():
@@ -84,7 +108,7 @@ def get_module_paths():
         if modules['left'] is not None and modules['right'] is not None:
             return modules
         else:
-            found_ports = find_matching_ports_windows("USB Serial Device")
+            found_ports = find_matching_ports_windows()
             modules['left'] = found_ports['left']
             modules['right'] = found_ports['right']
             log(f"get_module_paths: found ports -> {modules}")
@@ -95,31 +119,24 @@ def get_module_paths():
         return modules
     
     try:
-        result = subprocess.run(
-            ['ls', '-l', '/dev/serial/by-path/'], 
-            capture_output=True, 
-            text=True,
-            check=True
-        )
-        log("get_module_paths: ls output captured")
-        lines = result.stdout.strip().split('\n')
-        for line in lines:
-            # Find the 'ttyACM*' device name in the line
-            match = re.search(r'ttyACM\d+', line)
-            if not match:
-                continue  # Skip lines that aren't ttyACM devices
-            device_path = f"/dev/{match.group(0)}"
-            log(f"get_module_paths: found device {device_path} in line: {line.strip()}")
-            if RIGHT_PCI_PATH in line:
+        # Each entry is a symlink named after the physical port, pointing at
+        # the device node (e.g. ../../ttyACM0)
+        for name in os.listdir(SERIAL_BY_PATH_DIR):
+            link = os.path.join(SERIAL_BY_PATH_DIR, name)
+            device_path = os.path.normpath(os.path.join(SERIAL_BY_PATH_DIR, os.readlink(link)))
+            if not re.fullmatch(r'ttyACM\d+', os.path.basename(device_path)):
+                continue  # Skip entries that aren't ttyACM devices
+            log(f"get_module_paths: found device {device_path} at {name}")
+            if RIGHT_PCI_PATH in name:
                 modules['right'] = device_path # type: ignore
                 log(f"get_module_paths: mapped RIGHT -> {device_path}")
-            elif LEFT_PCI_PATH in line:
+            elif LEFT_PCI_PATH in name:
                 modules['left'] = device_path # type: ignore
                 log(f"get_module_paths: mapped LEFT -> {device_path}")
     except FileNotFoundError:
-        log("get_module_paths: Error: 'ls' command not found. Please ensure coreutils are installed.")
-    except subprocess.CalledProcessError as e:
-        log(f"get_module_paths: Error listing serial devices: {e.stderr}")
+        log(f"get_module_paths: Error: {SERIAL_BY_PATH_DIR} not found. Are the modules plugged in?")
+    except OSError as e:
+        log(f"get_module_paths: Error listing serial devices: {e}")
     except Exception as e:
         log(f"get_module_paths: unexpected error: {e}")
     log(f"get_module_paths: result -> {modules}")
@@ -130,87 +147,70 @@ def create_matrix(matrix_data):
     Converts a 2D matrix (34 rows, 9 cols) into a 39-byte payload.
     
     Args:
-        matrix_data (list[list[int]]): 2D array of 34x9. 1 = ON, 0 = OFF.
+        matrix_data (list[list[int]] | np.ndarray | int): 2D array of 34x9. 1 = ON, 0 = OFF.
+            May also be a bitboard (see simulations/bitboard.py), which is
+            already in the wire bit order and is sent without repacking.
+
+    Returns:
+        bytes: The 39-byte 'drawbw' payload.
     """
-    log(f"create_matrix: building payload")
+    log.d("create_matrix: building payload")
+    if isinstance(matrix_data, int):
+        return matrix_data.to_bytes((WIDTH * HEIGHT + 7) // 8, 'little')
     
-    # 1. Initialize the 39-byte payload with all zeros (LEDs off)
-    vals = [0] * 39
-
-    # 2. Pack the 2D matrix data into the 39-byte list
-    pixels_set = 0
-    for row in range(HEIGHT):
-        for col in range(WIDTH):
-            
-            # Check the cell value. 
-            # We assume 1 is ON, 0 is OFF.
-            cell = matrix_data[row][col]
-            if cell == 1:
-                # Convert [row][col] to 1D index
-                i = col + row * WIDTH
-                
-                # Find the byte index (i // 8)
-                # Find the bit index (i % 8)
-                # Set the corresponding bit to 1
-                vals[i // 8] |= (1 << (i % 8))
-                pixels_set += 1
-    log(f"draw_matrix: packed {pixels_set} pixels into payload")
-    return vals
+    # Cell (row, col) is bit i = col + row * WIDTH of the payload, i.e.
+    # bit (i % 8) of byte (i // 8): exactly little-endian bit packing of
+    # the row-major board.
+    on = (np.asarray(matrix_data) == 1).ravel()
+    payload = np.packbits(on, bitorder='little').tobytes()
+    if log.verbose:
+        log(f"draw_matrix: packed {int(on.sum())} pixels into payload")
+    return payload
 
 def draw_matrix_on_board(matrix_data, which='both'):
     send_command(COMMANDS['drawbw'], create_matrix(matrix_data), which=which)
 
 
-def create_greyscale_payloads(matrix_data: List[List[int]]) -> List[List[int]]:
+def create_greyscale_payloads(matrix_data: List[List[int]] | np.ndarray) -> List[bytes]:
     """
     Prepares the 9 separate column-payloads for the 'stagecol' command.
     
     Args:
-        matrix_data (list[list[int]]): 2D array of 34x9 with brightness 0-255.
+        matrix_data (list[list[int]] | np.ndarray): 2D array of 34x9 with brightness 0-255.
 
     Returns:
-        list[list[int]]: A list of 9 payloads. Each payload is
-                        [col_index] + [34 bytes of brightness].
+        list[bytes]: A list of 9 payloads. Each payload is
+                     [col_index] + [34 bytes of brightness].
     """
-    all_payloads = []
-    log("create_greyscale_payloads: preparing 9 column payloads")
+    log.d("create_greyscale_payloads: preparing 9 column payloads")
     
-    # Iterate by COLUMN (0 to 8)
-    for col in range(WIDTH):
-        column_brightness_data = []
-        for row in range(HEIGHT):
-            # Get brightness, ensure it's an int and clamp (0-255)
-            brightness = matrix_data[row][col]
-            brightness = max(0, min(255, int(brightness)))
-            column_brightness_data.append(brightness)
+    # Clamp every brightness to 0-255 at once; row 'col' of the transpose
+    # is that column's 34 brightness bytes
+    columns = np.clip(np.asarray(matrix_data, dtype=np.int64), 0, 255).astype(np.uint8).T
+    all_payloads = [bytes((col,)) + columns[col].tobytes() for col in range(WIDTH)]
         
-        # Create the final parameters: [col_index] + [34 bytes]
-        parameters = [col] + column_brightness_data
-        all_payloads.append(parameters)
-        
-    log(f"create_greyscale_payloads: created {len(all_payloads)} payloads.")
+    log.d("create_greyscale_payloads: created %d payloads.", len(all_payloads))
     return all_payloads
 
-def draw_greyscale_on_board(matrix_data: List[List[int]], which: str = 'both'):
+def draw_greyscale_on_board(matrix_data: List[List[int]] | np.ndarray, which: str = 'both'):
     """
     Creates and draws a greyscale matrix on the board.
     This version does NOT track global state.
     
     Args:
-        matrix_data (list[list[int]]): 2D array of 34x9 (brightness 0-255).
+        matrix_data (list[list[int]] | np.ndarray): 2D array of 34x9 (brightness 0-255).
         which (str): 'left', 'right', 'both'.
     """
-    log(f"draw_greyscale_on_board: starting (which={which})")
+    log.d("draw_greyscale_on_board: starting (which=%s)", which)
 
     # 1. Create the payloads
     all_column_payloads = create_greyscale_payloads(matrix_data)
     
-    # 2. Send all the staged column data
-    for payload in all_column_payloads:
-        send_command(COMMANDS['stagecol'], payload, which)
-    
-    # 3. After all columns are staged, flush them to the display
-    send_command(COMMANDS['flushcols'], [], which)
+    # 2. Send all the staged column data, then flush them to the display,
+    # as one batch
+    commands = [(COMMANDS['stagecol'], payload) for payload in all_column_payloads]
+    commands.append((COMMANDS['flushcols'], b""))
+    send_commands(commands, which)
     log("draw_greyscale_on_board: flushed staged columns")
 
 def set_led(matrix, row, col, brightness):
@@ -220,13 +220,54 @@ def set_led(matrix, row, col, brightness):
     """
     if 0 <= row < HEIGHT and 0 <= col < WIDTH:
         matrix[row][col] = int(max(0, min(255, int(brightness))))
-        log(f"set_led: set ({row},{col}) -> {matrix[row][col]}")
     else:
         log(f"set_led: Warning: Pixel ({row}, {col}) is out of bounds.")
         print(f"Warning: Pixel ({row}, {col}) is out of bounds.")
 
-def send_command(command_id, parameters, which='both', with_response=False):
-    log(f"send_command: enter command_id={command_id} which={which} with_response={with_response}")
+# Magic bytes that start every command sent to a module
+_HDR = bytes((0x32, 0xAC))
+
+# Open serial handles keyed by device path. Each port is opened on first use
+# and reused by every later send_command, then closed when the process exits.
+_serial_ports = {}
+
+def _get_serial(path):
+    """Returns the cached serial handle for 'path', opening it if needed."""
+    port = _serial_ports.get(path)
+    if port is None or not port.is_open:
+        log.d("send_command: opening serial %s at 115200", path)
+        port = serial.Serial(path, 115200, timeout=1.0, write_timeout=1.0)
+        _serial_ports[path] = port
+    return port
+
+def _close_serial(path):
+    """Closes and forgets the cached serial handle for 'path', if any."""
+    port = _serial_ports.pop(path, None)
+    if port is not None:
+        try:
+            port.close()
+        except Exception:
+            pass
+
+@atexit.register
+def close_serial_ports():
+    """Closes every cached serial handle."""
+    for path in list(_serial_ports):
+        _close_serial(path)
+
+def _frame(command_id, parameters) -> bytes:
+    """Builds the wire bytes for one command: magic header, id, parameters."""
+    # parameters may be bytes (e.g. a create_matrix payload) or a list of ints
+    if not isinstance(parameters, (bytes, bytearray)):
+        parameters = bytes(parameters or b"")
+    return _HDR + bytes((command_id,)) + parameters
+
+def _send_frames(frames, which='both', with_response=False):
+    """
+    Writes already-framed commands, in order, to the module(s) in 'which'.
+    Each frame is its own write (the firmware parses one command per read),
+    but the module paths are resolved and the port fetched once per batch.
+    """
     if which == 'both' and with_response:
         log("send_command: Error - cannot request response from both modules")
         print("Error: Cannot request response from 'both' modules simultaneously.")
@@ -258,52 +299,80 @@ def send_command(command_id, parameters, which='both', with_response=False):
             print(f"Error: Path for '{module_name}' module not found. Skipping.")
             continue
             
-        try:
-            log(f"send_command: opening serial {path} at 115200")
-            with serial.Serial(path, 115200, timeout=1.0) as s:
+        sent = 0
+        for attempt in range(2):
+            try:
+                s = _get_serial(path)
+                if log.verbose:
+                    payload = frames[0]
+                    log(f"send_command: writing {len(frames)} payload(s) to {path}: {payload[:16]}{'...' if len(payload)>16 else ''}")
                 
-                payload = [0x32, 0xAC, command_id] + (parameters or [])
-                log(f"send_command: writing payload to {path}: {payload[:16]}{'...' if len(payload)>16 else ''}")
-                
-                s.write(bytes(payload))
-                s.flush()
+                if with_response:
+                    s.reset_input_buffer()
+                # Resume after the last frame that went out if this is a retry
+                while sent < len(frames):
+                    s.write(frames[sent])
+                    sent += 1
                 
                 if with_response:
+                    # Only wait for the OS to drain the write when a reply is
+                    # expected; fire-and-forget draws let the USB stack coalesce
+                    s.flush()
                     response_data = s.read(3) # Read 3 bytes, not 32
-                    log(f"send_command: received response from {path}: {response_data}")
+                    log.d("send_command: received response from %s: %s", path, response_data)
                 else:
-                    log(f"send_command: write completed to {path} (no response requested)")
-                    
-        except serial.SerialException as e:
-            log(f"send_command: SerialException for {path}: {e}")
-            print(f"Error connecting to {path}: {e}")
-        except Exception as e:
-            log(f"send_command: unexpected error for {path}: {e}")
-            print(f"An unexpected error occurred with {path}: {e}")
+                    log.d("send_command: write completed to %s (no response requested)", path)
+                break
+                        
+            except serial.SerialException as e:
+                # The cached handle may be stale (module reset or replugged): reopen once
+                _close_serial(path)
+                if attempt == 0:
+                    log(f"send_command: SerialException for {path}: {e}. Reconnecting.")
+                    continue
+                log(f"send_command: SerialException for {path}: {e}")
+                print(f"Error connecting to {path}: {e}")
+                # The module may have come back under another device node; look it up again next time
+                for side in ('left', 'right'):
+                    if modules.get(side) == path:
+                        modules[side] = None
+            except Exception as e:
+                log(f"send_command: unexpected error for {path}: {e}")
+                print(f"An unexpected error occurred with {path}: {e}")
+                break
 
     log("send_command: exiting")
     return response_data
 
-def coordinates_to_matrix(coordinates: List[Tuple[int, int]] | List[List[int]]) -> List[List[int]]:
+def send_command(command_id, parameters, which='both', with_response=False):
+    log.d("send_command: enter command_id=%s which=%s with_response=%s", command_id, which, with_response)
+    return _send_frames((_frame(command_id, parameters),), which, with_response)
+
+def send_commands(commands, which='both'):
+    """
+    Sends a batch of (command_id, parameters) pairs, in order, without
+    waiting for responses. Cheaper than calling send_command for each one.
+    """
+    frames = tuple(_frame(command_id, parameters) for command_id, parameters in commands)
+    log.d("send_commands: enter %d commands which=%s", len(frames), which)
+    if frames:
+        _send_frames(frames, which)
+
+def coordinates_to_matrix(coordinates: List[Tuple[int, int]] | List[List[int]]) -> np.ndarray:
     """
     Translates a list of (row, col) tuples into a full 34x9 2D matrix.
     
     Args:
         coordinates: A list of (row, col) tuples to mark as '1'.
+            Coordinates outside the matrix are ignored.
         
     Returns:
-        A 34x9 2D matrix (List[List[int]]).
+        A (34, 9) uint8 NumPy array.
     """
-    # 1. Create the initial board (all 0s)
-    matrix = [[0 for _ in range(WIDTH)] for _ in range(HEIGHT)]
-    
-    # 2. Seed the board with the coordinates
-    pixels_seeded = 0
-    for r, c in coordinates:
-        if 0 <= r < HEIGHT and 0 <= c < WIDTH:
-            matrix[r][c] = 1  # 1 = live
-            pixels_seeded += 1
-    
+    matrix = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    rows, cols = np.asarray(coordinates, dtype=int).reshape(-1, 2).T
+    inside = (0 <= rows) & (rows < HEIGHT) & (0 <= cols) & (cols < WIDTH)
+    matrix[rows[inside], cols[inside]] = 1  # 1 = live
     return matrix
 
 
@@ -360,19 +429,25 @@ def get_firmware_version():
     print(f"Left LED Module:  {left_parsed}")
 
 
+# 'drawbw' payloads for an all-off and an all-on board never change. Packed
+# directly rather than through create_matrix() so importing the module
+# does not log.
+_EMPTY_PAYLOAD = bytes((WIDTH * HEIGHT + 7) // 8)
+_FULL_PAYLOAD = np.packbits(np.ones(WIDTH * HEIGHT, dtype=np.uint8), bitorder='little').tobytes()
+
 def clear_graph():
     """
     Clears the LED matrix.
     """
     log("clear_graph: clearing matrix")
-    draw_matrix_on_board([[0] * WIDTH for _ in range(HEIGHT)], 'both')
+    send_command(COMMANDS['drawbw'], _EMPTY_PAYLOAD, 'both')
     
 def fill_graph():
     """
     Fills the LED matrix.
     """
     log("fill_graph: filling matrix")
-    draw_matrix_on_board([[1] * WIDTH for _ in range(HEIGHT)], 'both')
+    send_command(COMMANDS['drawbw'], _FULL_PAYLOAD, 'both')
 
 def start_animation():
     """Starts the LED animation."""
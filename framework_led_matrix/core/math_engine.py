@@ -1,3 +1,4 @@
+import functools
 import numpy as np
 import math
 from typing import Callable, List
@@ -104,28 +105,49 @@ def safe_arccosh(x):
 def safe_arctanh(x):
     """Arctanh clipped to the domain [-1, 1]"""
     # Clip just inside the bounds to avoid infinity
-    return float(np.arctanh(np.clip(x, -0.999999, 0.999999)))
+    return np.arctanh(np.clip(x, -0.999999, 0.999999))
 
 
-X_AXIS_HORIZONTAL = {
-    -4: 0, -3: 1, -2: 2, -1: 3, 0: 4, 1: 5, 2: 6, 3: 7, 4: 8
-}
-Y_AXIS_HORIZONTAL = {
-    -16: 33, -15: 32, -14: 31, -13: 30, -12: 29, -11: 28, -10: 27, -9: 26,
-    -8: 25, -7: 24, -6: 23, -5: 22, -4: 21, -3: 20, -2: 19, -1: 18, 0: 17,
-    1: 16, 2: 15, 3: 14, 4: 13, 5: 12, 6: 11, 7: 10, 8: 9, 9: 8, 10: 7,
-    11: 6, 12: 5, 13: 4, 14: 3, 15: 2, 16: 1, 17: 0
-}
+# Graph offset -> matrix index. The short (9 LED) axis spans offsets -4..4
+# and maps to offset + SHORT_AXIS_ORIGIN; the long (34 LED) axis spans
+# -16..17 and runs bottom to top, so it maps to LONG_AXIS_ORIGIN - offset.
+SHORT_AXIS_BIAS = 4
+LONG_AXIS_BIAS = 16
+SHORT_AXIS_ORIGIN = SHORT_AXIS_BIAS
+LONG_AXIS_ORIGIN = HEIGHT - 1 - LONG_AXIS_BIAS
 
-X_AXIS_VERTICAL = {
-    -16: 33, -15: 32, -14: 31, -13: 30, -12: 29, -11: 28, -10: 27, -9: 26,
-    -8: 25, -7: 24, -6: 23, -5: 22, -4: 21, -3: 20, -2: 19, -1: 18, 0: 17,
-    1: 16, 2: 15, 3: 14, 4: 13, 5: 12, 6: 11, 7: 10, 8: 9, 9: 8, 10: 7,
-    11: 6, 12: 5, 13: 4, 14: 3, 15: 2, 16: 1, 17: 0
-}
-Y_AXIS_VERTICAL = {
-    -4: 0, -3: 1, -2: 2, -1: 3, 0: 4, 1: 5, 2: 6, 3: 7, 4: 8
-}
+
+def x_horiz(offset: int) -> int:
+    """Column of x-offset 'offset' (-4..4) when the x axis is horizontal."""
+    return offset + SHORT_AXIS_ORIGIN
+
+def y_horiz(offset: int) -> int:
+    """Row of y-offset 'offset' (-16..17) when the x axis is horizontal."""
+    return LONG_AXIS_ORIGIN - offset
+
+def x_vert(offset: int) -> int:
+    """Row of x-offset 'offset' (-16..17) when the x axis is vertical."""
+    return LONG_AXIS_ORIGIN - offset
+
+def y_vert(offset: int) -> int:
+    """Column of y-offset 'offset' (-4..4) when the x axis is vertical."""
+    return offset + SHORT_AXIS_ORIGIN
+
+def x_horiz_vec(offsets: np.ndarray) -> np.ndarray:
+    """Vector form of x_horiz(); offsets must already be in range."""
+    return np.asarray(offsets) + SHORT_AXIS_ORIGIN
+
+def y_horiz_vec(offsets: np.ndarray) -> np.ndarray:
+    """Vector form of y_horiz(); offsets must already be in range."""
+    return LONG_AXIS_ORIGIN - np.asarray(offsets)
+
+def x_vert_vec(offsets: np.ndarray) -> np.ndarray:
+    """Vector form of x_vert(); offsets must already be in range."""
+    return LONG_AXIS_ORIGIN - np.asarray(offsets)
+
+def y_vert_vec(offsets: np.ndarray) -> np.ndarray:
+    """Vector form of y_vert(); offsets must already be in range."""
+    return np.asarray(offsets) + SHORT_AXIS_ORIGIN
 
 REGULAR_OPERATIONS = {
     "sin": lambda x: np.sin(x),
@@ -149,13 +171,13 @@ MATH_OPERATIONS = [
     lambda x: 8 * (np.sin(x * 1.0) + np.sin(x * 1.1)), lambda x: 16 * np.cos(x * 1.5 - 1), lambda x: 7*np.sin(x) + 3*np.sin(2*x) + 2*np.sin(3*x) + 1*np.sin(4*x), lambda x: 8 * np.sin(x) * np.cos(x), lambda x: 17 * np.tanh(x), lambda x: 17 * np.tanh(x * 2),
     lambda x: 17 * np.tanh(x * 0.4), lambda x: 10 * np.arctan(x), lambda x: 16 * np.arctan(x) * (2 / np.pi), lambda x: 0.6 * (x + 0.5)**2 - 10, lambda x: 17 * (x / 5.0)**3, lambda x: (x**4) / 40.0 - 10,
     lambda x: x**3 / 8.0, lambda x: 0.6 * x**2, lambda x: 16 * np.sin(x**2 / 3.0), lambda x: 15 * np.cos(x * 3) * np.exp(-(x**2) / 8.0), lambda x: 3 * x * np.sin(x * 2), lambda x: (x + 5) * np.cos(x * 4) - 15,
-    lambda x: 16 * np.sin(x) * (x / 5.0), lambda x: 17 * np.sin(np.pi * x / (5.0 if x < 0 else 4.0)), lambda x: 15 * np.abs(np.sin(x * 1.5)) - 5, lambda x: 5 * np.sqrt(np.abs(x)) * np.copysign(1, x), lambda x: 8 * np.sin(x) - 8 * np.cos(x), lambda x: 10 * np.tanh(x * 5) + 5 * np.tanh(x * 2),
+    lambda x: 16 * np.sin(x) * (x / 5.0), lambda x: 17 * np.sin(np.pi * x / np.where(x < 0, 5.0, 4.0)), lambda x: 15 * np.abs(np.sin(x * 1.5)) - 5, lambda x: 5 * np.sqrt(np.abs(x)) * np.copysign(1, x), lambda x: 8 * np.sin(x) - 8 * np.cos(x), lambda x: 10 * np.tanh(x * 5) + 5 * np.tanh(x * 2),
     lambda x: 17 * (x + 0.5) / 4.5 - 8.5, lambda x: 15 * np.tanh(np.sin(x) * 3), lambda x: 16 * np.sin(x * 2) * np.exp(-x / 5.0), lambda x: 8 * (x - np.floor(x)) * 2 - 8, lambda x: 16 * np.sin(x / 5.0 * np.pi) * np.cos(x * 4), lambda x: 16 * np.sinc(x / 2.0),
     lambda x: 16 * np.cos(x * 2) * np.exp(-np.abs(x) / 8.0), lambda x: 15 * np.abs(np.sin(x * 0.8)) * np.abs(np.cos(x * 2.5)), lambda x: 17 * np.sin(x * 0.5), lambda x: 4 * np.tan(np.sin(x * 0.5)), lambda x: 8 * np.sin(x) + 4 * np.sin(x*3.1) + 2 * np.cos(x*5.3), lambda x: 10 * (np.sin(x) + 0.3 * np.sin(x*3)),
-    lambda x: 0.1 * (x**2) + 5 * np.cos(x * 2) - 10, lambda x: 17 - 25 * np.exp(-(x**2) / 0.5), lambda x: 17 / (1 + np.exp(-x)) - 8.5, lambda x: 0.5 * np.cosh(x*0.5) - 10, lambda x: np.floor(x/2) + 3*np.sin(x*3), lambda x: 10 / (x + 0.1) if x > 0 else (10 / (x - 0.1) if x < 0 else 0),
+    lambda x: 0.1 * (x**2) + 5 * np.cos(x * 2) - 10, lambda x: 17 - 25 * np.exp(-(x**2) / 0.5), lambda x: 17 / (1 + np.exp(-x)) - 8.5, lambda x: 0.5 * np.cosh(x*0.5) - 10, lambda x: np.floor(x/2) + 3*np.sin(x*3), lambda x: np.where(x == 0, 0, 10 / (x + np.copysign(0.1, x))),
     lambda x: 8 * np.log(np.abs(x) + 1) * np.copysign(1, x), lambda x: 4 * np.sqrt(np.maximum(0, 16 - (x/2)**2)), lambda x: 16 * np.cos(np.sqrt(x**2 + 0.1)), lambda x: 8 * (np.sin(np.abs(x - 5)) + np.sin(np.abs(x + 5))), lambda x: 17 / (1 + (x/2)**2) - 8, lambda x: 15 * np.exp(-((x % 5 - 2.5)**2) / 0.5),
-    lambda x: 16 * (x/3 - np.floor(x/3)) - 8, lambda x: 9 * np.sin(x * 0.7) + 5 * np.sin(x * 1.8) + 3 * np.sin(x * 4.2), lambda x: 16 * np.i0(x * 0.8) / 10 - 8, lambda x: 15 * np.tanh(x * 0.5) * np.cos(x * 0.5), lambda x: 10 * np.sin(x) if np.all(np.floor(x) % 2 == 0) else 16 * np.sin(x), lambda x: 3 / (np.cos(x) + 1.1) - 1,
-    lambda x: 16 * (x/16) * np.sin(x*5), lambda x: 16 * np.exp(-x/8) * np.cos(x*2) if np.all(x > 0) else 16 * np.exp(x/8) * np.cos(x*2), lambda x: 15 * np.exp(-((x % 4 - 1)**2) / 0.1) + 10 * np.exp(-((x % 4 - 1.5)**2) / 0.1), lambda x: 16 / (1 + np.abs(x)), lambda x: 16 * np.tanh(4 * np.sin(x)), lambda x: 4 * (1 / (np.tan(x/2) + 1e-6)),
+    lambda x: 16 * (x/3 - np.floor(x/3)) - 8, lambda x: 9 * np.sin(x * 0.7) + 5 * np.sin(x * 1.8) + 3 * np.sin(x * 4.2), lambda x: 16 * np.i0(x * 0.8) / 10 - 8, lambda x: 15 * np.tanh(x * 0.5) * np.cos(x * 0.5), lambda x: np.where(np.floor(x) % 2 == 0, 10, 16) * np.sin(x), lambda x: 3 / (np.cos(x) + 1.1) - 1,
+    lambda x: 16 * (x/16) * np.sin(x*5), lambda x: 16 * np.exp(-np.abs(x)/8) * np.cos(x*2), lambda x: 15 * np.exp(-((x % 4 - 1)**2) / 0.1) + 10 * np.exp(-((x % 4 - 1.5)**2) / 0.1), lambda x: 16 / (1 + np.abs(x)), lambda x: 16 * np.tanh(4 * np.sin(x)), lambda x: 4 * (1 / (np.tan(x/2) + 1e-6)),
     lambda x: 4 * np.round(x / 2), lambda x: 0.1 * x**2 + 5 * np.sin(x*3) - 12, lambda x: 17 * (x / (1 + np.abs(x))), lambda x: 16 * np.cos(x * 8) * np.exp(-((x-5)**2) / 8) if np.all(x > 0) else 16 * np.cos(x * 8) * np.exp(-((x-5)**2) / 8), lambda x: 4 * np.sin(x * 10), lambda x: 4 * (x**2) - 4,
     lambda x: 4 * (x**3) / 10, lambda x: 4 * np.exp(-(x**2) / 0.5) * 2 - 4, lambda x: np.where(np.abs(x) < 2, 4, -4), lambda x: 4 * (np.abs(x % 2 - 1) * 2 - 1), lambda x: 4 * np.abs(x) - 4, lambda x: 2 * (x**4) - 4 * (x**2),
     lambda x: 4 * np.tanh(x * 3), lambda x: 4 * np.cos(x * (np.pi / 4)), lambda x: 4 * (np.exp(-((x-2)**2) / 0.2) + np.exp(-((x+2)**2) / 0.2)) - 4, lambda x: 4 * np.sinc(x * 2), lambda x: 4 * np.sin(x * (np.pi / 4)), lambda x: 2 * np.round(x),
@@ -207,49 +229,127 @@ def ridiculously_safe_round(x: int | float) -> int:
     return round(x)
 
 
-def pick_largest_graph(x) -> List[List[int]]:
-    vert_graph = create_graph_with_vertical_x_axis(False, x, False)
-    horiz_graph = create_graph_with_horizontal_x_axis(False, x, False)
-    vert_count = sum(1 for row in vert_graph for cell in row if cell == 1)
-    horiz_count = sum(1 for row in horiz_graph for cell in row if cell == 1)
-    return horiz_graph if horiz_count >= vert_count else vert_graph
+def _scalar_sample(function: Callable[[float], float], xf: float) -> float:
+    """Evaluates 'function' at one point; NaN where the graph code would skip it."""
+    y_val = function(xf)
+    if isinstance(y_val, np.ndarray):
+        y_val = y_val.item()
+    if ridiculously_safe_round(y_val) == unguessable_constant:
+        return math.nan
+    return float(y_val)
+
+
+# Points re-evaluated one by one to confirm a vectorized result
+_SPOT_CHECKS = 16
 
 
+def sample_function(function: Callable[[float], float], xs: np.ndarray) -> np.ndarray:
+    """
+    Evaluates 'function' at every x in 'xs'.
+
+    The function is called once on the whole array when it supports that.
+    Some MATH_OPERATIONS only work on scalars: they raise on arrays, or
+    branch on np.all(...) and silently give a different result. A few
+    points are therefore re-evaluated as scalars, and on any mismatch (or
+    error) the whole range is sampled point by point instead.
+
+    Returns:
+        A float array like 'xs'; NaN marks points to skip (complex, NaN,
+        Inf or non-numeric results).
+    """
+    try:
+        with np.errstate(all='ignore'):
+            ys = np.asarray(function(xs))
+            if np.iscomplexobj(ys):
+                raise TypeError("complex result")
+            ys = np.broadcast_to(ys.astype(float), xs.shape)
+            ys = np.where(np.isfinite(ys), ys, np.nan)
+            checks = np.linspace(0, len(xs) - 1, _SPOT_CHECKS).astype(int)
+            expected = np.array([_scalar_sample(function, float(xs[i])) for i in checks])
+        if not np.allclose(ys[checks], expected, rtol=1e-9, atol=1e-9, equal_nan=True):
+            raise ValueError("vectorized result differs from scalar evaluation")
+        return ys
+    except Exception:
+        return np.array([_scalar_sample(function, float(x)) for x in xs])
+
+
+@functools.lru_cache(maxsize=512)
+def _largest_graph(x) -> np.ndarray:
+    # Functions are deterministic over a fixed sample grid, so each one's
+    # graph only needs computing once per session.
+    vert_graph = _BLANK_GRAPH.copy()
+    _plot_vertical(vert_graph, sample_function(x, _XS_VERTICAL))
+    horiz_graph = _BLANK_GRAPH.copy()
+    _plot_horizontal(horiz_graph, sample_function(x, _XS_HORIZONTAL))
+    vert_count = np.count_nonzero(vert_graph == 1)
+    horiz_count = np.count_nonzero(horiz_graph == 1)
+    graph = horiz_graph if horiz_count >= vert_count else vert_graph
+    graph.setflags(write=False)
+    return graph
+
+
+def pick_largest_graph(x) -> np.ndarray:
+    """Returns a copy of whichever orientation of x's graph lights more LEDs."""
+    return _largest_graph(x).copy()
+
+
+
+# Built once and copied by the graph builders: an empty board, the same
+# board with both axes lit (row 17 and column 4 in either orientation), and
+# the x values each orientation samples. The horizontal grid is not a slice
+# of the vertical one: np.arange accumulates different rounding error, and
+# some functions (chaotic ones especially) are sensitive to it.
+_BLANK_GRAPH = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+_AXES_TEMPLATE = _BLANK_GRAPH.copy()
+_AXES_TEMPLATE[LONG_AXIS_ORIGIN, :] = 1
+_AXES_TEMPLATE[:, SHORT_AXIS_ORIGIN] = 1
+_XS_VERTICAL = np.arange(-16, 17, 0.01)
+_XS_HORIZONTAL = np.arange(-4, 5, 0.01)
+# The x half of every sample's LED index and bounds check never changes
+_XI_HORIZONTAL = np.rint(_XS_HORIZONTAL).astype(int)
+_XI_VERTICAL = np.rint(_XS_VERTICAL).astype(int)
+_X_ON_HORIZONTAL = np.abs(_XI_HORIZONTAL) <= (WIDTH//2)
+_X_ON_VERTICAL = (-LONG_AXIS_BIAS <= _XI_VERTICAL) & (_XI_VERTICAL <= LONG_AXIS_BIAS + 1)
+for _template in (_BLANK_GRAPH, _AXES_TEMPLATE, _XS_VERTICAL, _XS_HORIZONTAL, _XI_HORIZONTAL, _XI_VERTICAL,
+                  _X_ON_HORIZONTAL, _X_ON_VERTICAL):
+    _template.setflags(write=False)
+
+
+def _plot_horizontal(matrix: np.ndarray, ys: np.ndarray) -> int:
+    """Lights the samples 'ys' taken at _XS_HORIZONTAL; returns how many landed."""
+    # Round like round() (half to even); NaN compares False so it is dropped
+    yr = np.rint(ys)
+    mask = (np.abs(yr) <= (HEIGHT//2)-1) & _X_ON_HORIZONTAL
+    matrix[y_horiz_vec(yr[mask].astype(int)), x_horiz_vec(_XI_HORIZONTAL[mask])] = 1
+    return int(mask.sum())
+
+
+def _plot_vertical(matrix: np.ndarray, ys: np.ndarray) -> int:
+    """Lights the samples 'ys' taken at _XS_VERTICAL; returns how many landed."""
+    # Round like round() (half to even); NaN compares False so it is dropped
+    yr = np.rint(ys)
+    mask = (-SHORT_AXIS_BIAS <= yr) & (yr <= SHORT_AXIS_BIAS) & _X_ON_VERTICAL
+    matrix[x_vert_vec(_XI_VERTICAL[mask]), y_vert_vec(yr[mask].astype(int))] = 1
+    return int(mask.sum())
+
 
 def create_graph_with_horizontal_x_axis(axis: bool = False, function: Callable[[float], float] = lambda x: x**2, draw_function: bool = True):
     """
     Creates a graph on the LED matrix.
     axis (bool): If True, draws the X and Y axes.
     function (Callable[[float], float]): The mathematical function to graph.
+
+    Returns a (HEIGHT, WIDTH) uint8 array.
     """
-    log(f"create_graph_with_horizontal_x_axis: start axis={axis} function={function}")
-    matrix = [[0] * WIDTH for _ in range(HEIGHT)]
+    log.d("create_graph_with_horizontal_x_axis: start axis=%s function=%s", axis, function)
+    matrix = (_AXES_TEMPLATE if axis else _BLANK_GRAPH).copy()
     if function:
-        matrix = [[0] * WIDTH for _ in range(HEIGHT)]
         if axis:
-            log("create_graph_with_horizontal_x_axis: drawing axes")
-            for i in range(0, WIDTH):
-                matrix[17][i] = 1
-            for i in range(0, HEIGHT):
-                matrix[i][4] = 1
-        points_plotted = 0
-        for x in np.arange(-4,5, 0.01):
-            xf = float(x)
-            y_val = function(xf)
-            if isinstance(y_val, np.ndarray):
-                y_val = y_val.item()
-            y = ridiculously_safe_round(y_val)
-            if y == unguessable_constant:
-                continue
-            xi = round(xf)
-            if abs(y) > (HEIGHT//2)-1 or abs(xi) > (WIDTH//2):
-                continue
-            else:
-                matrix[Y_AXIS_HORIZONTAL[y]][X_AXIS_HORIZONTAL[xi]] = 1
-                points_plotted += 1
+            log.d("create_graph_with_horizontal_x_axis: drawing axes")
+        points_plotted = _plot_horizontal(matrix, sample_function(function, _XS_HORIZONTAL))
         if draw_function:
             draw_matrix_on_board(matrix, 'both')
-            log(f"create_graph_with_horizontal_x_axis: drawbw sent, plotted {points_plotted} points")
+            log.d("create_graph_with_horizontal_x_axis: drawbw sent, plotted %d points", points_plotted)
         return matrix
 
 def create_graph_with_vertical_x_axis(axis: bool = False, function: Callable[[float], float] = lambda x: x**2, draw_function: bool = True):
@@ -257,34 +357,18 @@ def create_graph_with_vertical_x_axis(axis: bool = False, function: Callable[[fl
     Creates a graph on the LED matrix. (Rotated 90 degrees)
     X-Axis: long (34 rows)
     Y-Axis: short (9 cols)
+
+    Returns a (HEIGHT, WIDTH) uint8 array.
     """
-    log(f"create_graph_with_vertical_x_axis: start axis={axis} function={function}")
-    matrix = [[0] * WIDTH for _ in range(HEIGHT)]
+    log.d("create_graph_with_vertical_x_axis: start axis=%s function=%s", axis, function)
+    matrix = (_AXES_TEMPLATE if axis else _BLANK_GRAPH).copy()
     if function:
         if axis:
-            log("create_graph_with_vertical_x_axis: drawing axes")
-            for i in range(0, HEIGHT):
-                matrix[i][4] = 1
-            for i in range(0, WIDTH):
-                matrix[17][i] = 1
-        points_plotted = 0
-        for x_val in np.arange(-16, 17, 0.01):
-            xf = float(x_val)
-            y_val = function(xf)
-            if isinstance(y_val, np.ndarray):
-                y_val = y_val.item()
-            y = ridiculously_safe_round(y_val)
-            if y == unguessable_constant:
-                continue
-            xi = round(xf)
-            if y not in Y_AXIS_VERTICAL or xi not in X_AXIS_VERTICAL:
-                continue
-            else:
-                matrix[X_AXIS_VERTICAL[xi]][Y_AXIS_VERTICAL[y]] = 1
-                points_plotted += 1
+            log.d("create_graph_with_vertical_x_axis: drawing axes")
+        points_plotted = _plot_vertical(matrix, sample_function(function, _XS_VERTICAL))
         if draw_function:
             draw_matrix_on_board(matrix, 'both')
-            log(f"create_graph_with_vertical_x_axis: drawbw sent, plotted {points_plotted} points")
+            log.d("create_graph_with_vertical_x_axis: drawbw sent, plotted %d points", points_plotted)
         return matrix
 
 # for func in MATH_OPERATIONS:
@@ -1,9 +1,9 @@
-import cellpylib as cpl
 import numpy as np
 import time
-import random
 from framework_led_matrix.core.led_commands import log, clear_graph, WIDTH, HEIGHT, draw_greyscale_on_board
-from typing import List
+from framework_led_matrix.core.accel import njit, HAVE_NUMBA
+from framework_led_matrix.simulations.seeding import random_cells
+from framework_led_matrix.utils.frame_pipeline import prefetch_frames, RedrawGate
 import matplotlib.pyplot as plt
 from matplotlib.colors import ListedColormap
 
@@ -13,117 +13,119 @@ BML_RED_RIGHT = 1
 BML_BLUE_DOWN = 2
 
 
-def draw_bml_board(board: List[List[int]], which: str):
+# Greyscale brightness for each BML state: Empty, Red (bright), Blue (grey)
+_BML_LUT = np.array([0, 255, 128], dtype=np.uint8)
+
+
+def draw_bml_board(board: np.ndarray, which: str):
     """
     Converts the 3-state BML board (0,1,2) to a greyscale
     matrix (0, 255, 128) and draws it.
     """
     # We must use greyscale for three states
-    greyscale_matrix = [[0 for _ in range(WIDTH)] for _ in range(HEIGHT)]
-    for r in range(HEIGHT):
-        for c in range(WIDTH):
-            state = board[r][c]
-            if state == BML_RED_RIGHT:
-                greyscale_matrix[r][c] = 255 # Bright
-            elif state == BML_BLUE_DOWN:
-                greyscale_matrix[r][c] = 128 # Grey
-            # else: 0 (Empty)
-            
+    greyscale_matrix = _BML_LUT[np.asarray(board)]
     draw_greyscale_on_board(greyscale_matrix, which)
 
-def bml_rule(neighbourhood: np.ndarray, c_coord: tuple, t: int):
+@njit(cache=True, boundscheck=False)
+def _step_bml_board_jit(board, out, red_turn):
+    height, width = board.shape
+    out[:, :] = board
+    moved = 0
+    for r in range(height):
+        rs = 0 if r == height - 1 else r + 1
+        for c in range(width):
+            if red_turn:
+                if board[r, c] == BML_RED_RIGHT:
+                    ce = 0 if c == width - 1 else c + 1
+                    if board[r, ce] == BML_EMPTY:
+                        out[r, c] = BML_EMPTY
+                        out[r, ce] = BML_RED_RIGHT
+                        moved += 1
+            elif board[r, c] == BML_BLUE_DOWN and board[rs, c] == BML_EMPTY:
+                out[r, c] = BML_EMPTY
+                out[rs, c] = BML_BLUE_DOWN
+                moved += 1
+    return moved
+
+def _step_bml_board_np(board, out, red_turn):
+    if red_turn:
+        car, axis = BML_RED_RIGHT, 1
+    else:
+        car, axis = BML_BLUE_DOWN, 0
+
+    # A car moves if the cell ahead of it (wrapping) is empty
+    ahead_empty = np.roll(board == BML_EMPTY, -1, axis=axis)
+    movers = (board == car) & ahead_empty
+    np.copyto(out, board)
+    out[movers] = BML_EMPTY
+    out[np.roll(movers, 1, axis=axis)] = car
+    return int(movers.sum())
+
+def step_bml_board(board: np.ndarray, out: np.ndarray, red_turn: bool) -> int:
     """
-    The BML rule for cellpylib's evolve2d.
-    
+    Advances the BML board by one half-step.
+
+    On a red turn every red car whose EAST neighbour is empty moves one
+    cell right; on a blue turn every blue car whose SOUTH neighbour is empty
+    moves one cell down. All moves are decided from the state at the start
+    of the half-step, and the board wraps around at the edges.
+
+    Uses a Numba kernel when available, otherwise NumPy roll+mask.
+
     Args:
-        neighbourhood: The 2D (3x3) NumPy array for the Moore neighborhood (r=1).
-                        [[0,0(NW), 0,1(N), 0,2(NE)],
-                        [1,0(W),  1,1(C), 1,2(E) ],
-                        [2,0(SW), 2,1(S), 2,2(SE)]]
-        c_coord (tuple): The (row, col) coordinate. We don't use this.
-        t (int): The current timestep.
+        board: The 2D (HEIGHT, WIDTH) uint8 board.
+        out: A preallocated uint8 array of the same shape that receives the
+             new board. Must not be `board`.
+        red_turn (bool): True for a red (right) turn, False for blue (down).
+
+    Returns:
+        int: The number of cars that moved.
     """
-    
-    # --- Get the neighbors we care about from the 3x3 array ---
-    # The (0,0) coordinate of the 3x3 grid is NW
-    
-    N = neighbourhood[0, 1]  # North neighbor
-    W = neighbourhood[1, 0]  # West neighbor
-    c = neighbourhood[1, 1]  # The CURRENT cell's value (Center)
-    E = neighbourhood[1, 2]  # East neighbor
-    S = neighbourhood[2, 1]  # South neighbor
-    
-    # t=0 is the initial state.
-    # t=1, 3, 5... should be Red's turn
-    # t=2, 4, 6... should be Blue's turn
-    
-    # On t=0 (initial state), do nothing, just return the current state.
-    if t == 0:
-        return c
-        
-    is_red_turn = (t % 2 == 1)
-    
-    if is_red_turn:
-        # --- Red Turn Logic (Blue cars are static) ---
-        
-        # 1. Am I a RED car?
-        if c == BML_RED_RIGHT:
-            # Check my EAST neighbor. If it's EMPTY, I move out.
-            return BML_EMPTY if E == BML_EMPTY else BML_RED_RIGHT
-        
-        # 2. Am I an EMPTY spot?
-        if c == BML_EMPTY:
-            # Check my WEST neighbor. If it's RED, it will move into me.
-            return BML_RED_RIGHT if W == BML_RED_RIGHT else BML_EMPTY
+    if HAVE_NUMBA:
+        return _step_bml_board_jit(board, out, red_turn)
+    return _step_bml_board_np(board, out, red_turn)
 
-        # 3. Am I a BLUE car?
-        # if c == BML_BLUE_DOWN:
-        return BML_BLUE_DOWN # Blue cars don't move on red turns
+def evolve_bml_board(initial_state: np.ndarray, steps: int) -> np.ndarray:
+    """
+    Evolves the BML board and returns the full history.
 
-    else:
-        # --- Blue Turn Logic (Red cars are static) ---
-        
-        # 1. Am I a BLUE car?
-        if c == BML_BLUE_DOWN:
-            # Check my SOUTH neighbor. If it's EMPTY, I move out.
-            return BML_EMPTY if S == BML_EMPTY else BML_BLUE_DOWN
-            
-        # 2. Am I an EMPTY spot?
-        if c == BML_EMPTY:
-            # Check my NORTH neighbor. If it's BLUE, it will move into me.
-            return BML_BLUE_DOWN if N == BML_BLUE_DOWN else BML_EMPTY
-            
-        # 3. Am I a RED car?
-        # if c == BML_RED_RIGHT:
-        return BML_RED_RIGHT # Red cars don't move on blue turns
+    Frame 0 is the initial state; odd frames are red (right) half-steps and
+    even frames are blue (down) half-steps.
+
+    Returns:
+        A 3D NumPy array of shape (steps, HEIGHT, WIDTH)
+    """
+    history = np.empty((max(steps, 1), HEIGHT, WIDTH), dtype=np.uint8)
+    board = np.array(initial_state, dtype=np.uint8)
+    out = np.empty_like(board)
+    history[0] = board
+    for t in range(1, steps):
+        step_bml_board(board, out, red_turn=(t % 2 == 1))
+        board, out = out, board
+        history[t] = board
+    return history
     
 def create_bml_board_np(density: float = 0.35) -> np.ndarray:
     """
     Creates a new random board for the BML traffic model as a NumPy array.
     (Adapted from your BihamMiddletonLevineTrafficModel.py)
     """
-    log(f"BML (cpl): Creating new NumPy board with density {density}")
-    board = np.full((HEIGHT, WIDTH), BML_EMPTY, dtype=int)
+    log(f"BML: Creating new NumPy board with density {density}")
+    board = np.full((HEIGHT, WIDTH), BML_EMPTY, dtype=np.uint8)
     
     total_cells = WIDTH * HEIGHT
     num_cars = int(total_cells * density)
     num_red = num_cars // 2
     num_blue = num_cars - num_red
     
-    cells = [(r, c) for r in range(HEIGHT) for c in range(WIDTH)]
-    random.shuffle(cells)
+    # Pick distinct cells for every car in one shot
+    rows, cols = random_cells(num_cars)
     
-    # Place red (right-moving) cars
-    for i in range(num_red):
-        r, c = cells.pop()
-        board[r, c] = BML_RED_RIGHT
-        
-    # Place blue (down-moving) cars
-    for i in range(num_blue):
-        r, c = cells.pop()
-        board[r, c] = BML_BLUE_DOWN
+    # Place red (right-moving) cars, then blue (down-moving) cars
+    board[rows[:num_red], cols[:num_red]] = BML_RED_RIGHT
+    board[rows[num_red:], cols[num_red:]] = BML_BLUE_DOWN
         
-    log(f"BML (cpl): Seeded board with {num_red} red and {num_blue} blue cars.")
+    log(f"BML: Seeded board with {num_red} red and {num_blue} blue cars.")
     return board
 
 def show_bml_local_animation(
@@ -134,22 +136,19 @@ def show_bml_local_animation(
     Runs the BML simulation and displays the result
     on the laptop screen using Matplotlib.
     """
+    # cellpylib is only needed for its animator; importing it is slow, so
+    # keep it off the import path of the LED-matrix code
+    import cellpylib as cpl
+
     log(f"BML (Local): Starting local animation. density={density}, steps={steps}")
 
     # 1. Create the initial state (reuses your function)
     initial_state_2d = create_bml_board_np(density)
-    initial_state_3d = np.array([initial_state_2d])
 
     log(f"BML (Local): Evolving {steps} half-steps...")
 
-    # 2. Run the *entire* evolution (reuses your rule)
-    all_half_steps = cpl.evolve2d(
-        cellular_automaton=initial_state_3d,
-        timesteps=steps,
-        neighbourhood='Moore',
-        apply_rule=bml_rule,
-        r=1
-    )
+    # 2. Run the *entire* evolution
+    all_half_steps = evolve_bml_board(initial_state_2d, steps)
 
     log(f"BML (Local): Evolution complete. Shape: {all_half_steps.shape}. Starting animation.")
 
@@ -173,6 +172,32 @@ def show_bml_local_animation(
 
     log("BML (Local): Animation window closed.")
 
+def generate_bml_frames(density: float = 0.35, steps: int = 500):
+    """
+    Yields (i, turn_name, board, gridlocked) for each half-step of a fresh
+    BML run. 'board' is a copy, so frames can be buffered safely.
+
+    Stops after the first frame whose 'gridlocked' flag is set. Cars only
+    ever move forward, so once a red and a blue half-step in a row both
+    move no cars, the board can never change again.
+    """
+    board = create_bml_board_np(density)
+    out = np.empty_like(board)
+    zero_moves_streak = 0
+    for i in range(steps):
+        if i == 0:
+            turn_name = "Initial State"
+        else:
+            red_turn = (i % 2 == 1)
+            cars_moved = step_bml_board(board, out, red_turn)
+            board, out = out, board
+            turn_name = "Red (Right)" if red_turn else "Blue (Down)"
+            zero_moves_streak = zero_moves_streak + 1 if cars_moved == 0 else 0
+        gridlocked = zero_moves_streak >= 2
+        yield i, turn_name, board.copy(), gridlocked
+        if gridlocked:
+            return
+
 def run_bml(
     density: float = 0.35,
     steps: int = 500, # Total half-steps (same as your original function)
@@ -180,56 +205,32 @@ def run_bml(
     which: str = 'both'
 ):
     """
-    Runs the BML Traffic Model simulation using cellpylib.
+    Runs the BML Traffic Model simulation on the LED matrix.
     """
-    log(f"BML (cpl): Starting simulation. density={density}, steps={steps}")
-    
-    initial_state_2d = create_bml_board_np(density)
-    initial_state_3d = np.array([initial_state_2d]) 
-    
-    log(f"BML (cpl): Evolving {steps} half-steps...")
-    
-    all_half_steps = cpl.evolve2d(
-        cellular_automaton=initial_state_3d,
-        timesteps=steps,
-        neighbourhood='Moore',
-        apply_rule=bml_rule,
-        r=1 
-    )
-    
-    log(f"BML (cpl): Evolution complete. Result shape: {all_half_steps.shape}")
+    log(f"BML: Starting simulation. density={density}, steps={steps}")
     
+    # Half-steps are computed on a background thread while the current
+    # frame is on screen, and the producer stops as soon as it gridlocks.
     try:
-        stable_counter = 0
-        total_frames = all_half_steps.shape[0]
-        for i in range(total_frames):            
-            current_board_np = all_half_steps[i]            
-            current_board_list = current_board_np.tolist()            
-            draw_bml_board(current_board_list, which)
+        redraw = RedrawGate()
+        for i, turn_name, board, gridlocked in prefetch_frames(generate_bml_frames(density, steps)):
+            if redraw.needs_draw(board):
+                draw_bml_board(board, which)
             time.sleep(delay_sec)
-            if i == 0:
-                turn_name = "Initial State"
-            else:
-                turn_name = "Red (Right)" if (i % 2 == 1) else "Blue (Down)"
-            if i % 20 == 0 or i == total_frames - 1:
-                log(f"BML (cpl): Step {i}/{steps} ({turn_name}).")
-            if i > 2:
-                if np.array_equal(current_board_np, all_half_steps[i-2]):
-                    stable_counter += 1
-                else:
-                    stable_counter = 0
+            if i % 20 == 0 or i == steps - 1:
+                log(f"BML: Step {i}/{steps} ({turn_name}).")
             
-            if stable_counter >= 20:
-                log("BML (cpl): GRIDLOCK. State stable for 10 full cycles. Halting.")
+            if gridlocked:
+                log("BML: GRIDLOCK. No car can move in either direction. Halting.")
                 time.sleep(2)
                 break
                 
     except KeyboardInterrupt:
-        log("BML (cpl): KeyboardInterrupt received, stopping.")
+        log("BML: KeyboardInterrupt received, stopping.")
     finally:
-        log(f"BML (cpl): simulation finished.")
+        log(f"BML: simulation finished.")
         clear_graph()
-        log("BML (cpl): cleared display.")
+        log("BML: cleared display.")
 
 if __name__ == "__main__":
     try:
@@ -4,19 +4,22 @@
 hpp_lga_model.py
 
 Implements the HPP (Hardy-Pomeau-Pazzis) Lattice Gas Automaton (LGA)
-for the 34x9 LED matrix, using the cellpylib library.
+for the 34x9 LED matrix.
 
 This automaton models fluid dynamics using 4-bit particle states
 and specific collision/propagation rules. It is NOT a totalistic
-automaton and requires a custom 'apply_rule' function.
+automaton, so each step is computed as a vectorized NumPy stencil
+over the whole board.
 """
 
-import cellpylib as cpl
 import numpy as np
 import time
-import random
-from typing import List, Optional
+from typing import Optional
 from framework_led_matrix.core.led_commands import log, clear_graph, WIDTH, HEIGHT, draw_matrix_on_board, reset_modules
+from framework_led_matrix.core.accel import njit, HAVE_NUMBA
+from framework_led_matrix.simulations.seeding import random_cells
+from framework_led_matrix.simulations.bitboard import pack_board, unpack_bits, shift_up, shift_down, shift_right, shift_left
+from framework_led_matrix.utils.frame_pipeline import prefetch_frames, RedrawGate
 
 # --- HPP Particle States (Bitmasks) ---
 # A cell's state is the bitwise OR of the particles it contains.
@@ -32,85 +35,142 @@ WE_COLLIDE = W_PARTICLE | E_PARTICLE # 3 (West + East)
 NS_COLLIDE = N_PARTICLE | S_PARTICLE # 12 (North + South)
 
 
-def draw_hpp_board(board: List[List[int]], which: str):
+# Maps each of the 16 HPP states to a regular matrix value: 0 = Empty, 1 = Occupied
+_HPP_LUT = (np.arange(16) != EMPTY).astype(np.uint8)
+
+
+def draw_hpp_board(board: np.ndarray, which: str):
     """
     Converts the 16-state HPP board to a regular matrix
     (0-1) and draws it.
     """
-    matrix = [[0 for _ in range(WIDTH)] for _ in range(HEIGHT)]
-    for r in range(HEIGHT):
-        for c in range(WIDTH):
-            state = board[r][c]
-            if state != EMPTY:
-                matrix[r][c] = 1  # Occupied
-            else:
-                matrix[r][c] = 0  # Empty
+    matrix = _HPP_LUT[np.asarray(board)]
     draw_matrix_on_board(matrix, which)
 
 
-def hpp_collide(state: int) -> int:
+# Post-collision state of each of the 16 cell states: N+S <-> E+W, rest unchanged
+COLLIDE_LUT = np.arange(16, dtype=np.uint8)
+COLLIDE_LUT[NS_COLLIDE] = WE_COLLIDE
+COLLIDE_LUT[WE_COLLIDE] = NS_COLLIDE
+
+
+@njit(cache=True, boundscheck=False)
+def _step_hpp_board_jit(board, out, lut):
+    # Collision and propagation fused into one pass: each cell reads its 4
+    # neighbours, collides them through the LUT and keeps the incoming bit.
+    height, width = board.shape
+    for r in range(height):
+        rn = height - 1 if r == 0 else r - 1
+        rs = 0 if r == height - 1 else r + 1
+        for c in range(width):
+            cw = width - 1 if c == 0 else c - 1
+            ce = 0 if c == width - 1 else c + 1
+            out[r, c] = ((lut[board[rn, c]] & S_PARTICLE)
+                         | (lut[board[rs, c]] & N_PARTICLE)
+                         | (lut[board[r, cw]] & E_PARTICLE)
+                         | (lut[board[r, ce]] & W_PARTICLE))
+
+
+def _step_hpp_board_np(board, out):
+    # 1. Collide
+    post = COLLIDE_LUT[board]
+
+    # 2. Propagate
+    from_north = np.roll(post, 1, axis=0) & S_PARTICLE   # North neighbor's South particle
+    from_south = np.roll(post, -1, axis=0) & N_PARTICLE  # South neighbor's North particle
+    from_west = np.roll(post, 1, axis=1) & E_PARTICLE    # West neighbor's East particle
+    from_east = np.roll(post, -1, axis=1) & W_PARTICLE   # East neighbor's West particle
+    np.bitwise_or(from_north | from_south, from_west | from_east, out=out)
+
+
+def step_hpp_board(board: np.ndarray, out: np.ndarray):
     """
-    Computes the post-collision state for a single HPP cell.
-    This is the first half of the HPP rule.
+    Computes the next HPP generation for the whole board at once.
+
+    1. Collision: every N+S cell becomes E+W and every E+W cell becomes N+S.
+       All other states pass through unchanged.
+    2. Propagation: each cell "gathers" the particles moving *into* it from
+       its 4 neighbors' post-collision states (the board wraps around).
+
+    Uses a Numba kernel when available, otherwise a NumPy stencil.
+
+    Args:
+        board: The 2D (HEIGHT, WIDTH) uint8 array of 4-bit cell states.
+        out: A preallocated uint8 array of the same shape that receives the
+             next generation. Must not be `board`.
     """
-    # N+S collision (12)
-    if state == NS_COLLIDE: 
-        return WE_COLLIDE  # Becomes E+W (3)
-        
-    # E+W collision (3)
-    if state == WE_COLLIDE:
-        return NS_COLLIDE  # Becomes N+S (12)
-        
-    # All other states (0, 1, 2, 4, 5, 6, 7, 8, 9, 10, 11, 13, 14, 15)
-    # pass through unchanged.
-    return state
+    if HAVE_NUMBA:
+        _step_hpp_board_jit(board, out, COLLIDE_LUT)
+    else:
+        _step_hpp_board_np(board, out)
+
+
+# --- Bit-plane (SWAR) representation ---
+# The board is stored as four bitboards (see bitboard.py), one per particle
+# direction, so a single bitwise op updates every cell of the board at once.
+PLANE_PARTICLES = (N_PARTICLE, S_PARTICLE, E_PARTICLE, W_PARTICLE)
+_PLANE_WEIGHTS = np.array(PLANE_PARTICLES, dtype=np.uint8)
+
+
+def pack_hpp_planes(board: np.ndarray) -> tuple:
+    """Packs a (HEIGHT, WIDTH) HPP board into (N, S, E, W) bit-planes."""
+    board = np.asarray(board, dtype=np.uint8)
+    return tuple(pack_board(board & particle) for particle in PLANE_PARTICLES)
+
 
+def unpack_hpp_planes(planes: tuple, out: np.ndarray):
+    """Unpacks (N, S, E, W) bit-planes into a (HEIGHT, WIDTH) uint8 board."""
+    out[...] = (_PLANE_WEIGHTS @ unpack_bits(planes)).reshape(HEIGHT, WIDTH)
 
-def hpp_lga_rule(neighbourhood: np.ndarray, c_coord: tuple, t: int) -> int:
+
+def step_hpp_planes(planes: tuple) -> tuple:
     """
-    The HPP rule function for cellpylib's evolve2d.
-    This is the "Propagation" step. It calculates the new state of
-    the center cell (1,1) by "gathering" all particles that will
-    propagate *into* it from its 4 neighbors' *post-collision* states.
-    
-    Args:
-        neighbourhood: The 2D (3x3) NumPy array (Moore neighborhood).
-        c_coord (tuple): The (row, col) coordinate (unused).
-        t (int): The current timestep (unused).
+    Computes the next HPP generation on bit-planes, branch-free.
+
+    A cell collides only if it holds exactly N+S or exactly E+W; those cells
+    swap to the other pair. Each plane then shifts one cell in its direction
+    of travel, wrapping around the board edges.
     """
-    
-    # 1. Get the pre-collision state of the 4 neighbors we care about.
-    north_cell_pre_collide = neighbourhood[0, 1]
-    south_cell_pre_collide = neighbourhood[2, 1]
-    east_cell_pre_collide  = neighbourhood[1, 2]
-    west_cell_pre_collide  = neighbourhood[1, 0]
-    
-    # 2. Compute the post-collision state for each neighbor.
-    # This determines what particles are *available to move*
-    n_post_collide = hpp_collide(north_cell_pre_collide)
-    s_post_collide = hpp_collide(south_cell_pre_collide)
-    e_post_collide = hpp_collide(east_cell_pre_collide)
-    w_post_collide = hpp_collide(west_cell_pre_collide)
-    
-    # 3. "Gather" the particles that will arrive at the center cell.
-    
-    # The new North particle comes from the South neighbor's post-collision North particle.
-    from_south = s_post_collide & N_PARTICLE
-    
-    # The new South particle comes from the North neighbor's post-collision South particle.
-    from_north = n_post_collide & S_PARTICLE
-    
-    # The new West particle comes from the East neighbor's post-collision West particle.
-    from_east = e_post_collide & W_PARTICLE
-    
-    # The new East particle comes from the West neighbor's post-collision East particle.
-    from_west = w_post_collide & E_PARTICLE
-    
-    # The new state of the center cell is the bitwise OR 
-    # of all particles that have propagated into it.
-    new_center_state = from_north | from_south | from_east | from_west
-    
-    return new_center_state
+    n, s, e, w = planes
+
+    # 1. Collide
+    ns = n & s & ~(e | w)
+    we = e & w & ~(n | s)
+    swap = ns | we
+    n = (n & ~swap) | we
+    s = (s & ~swap) | we
+    e = (e & ~swap) | ns
+    w = (w & ~swap) | ns
+
+    # 2. Propagate
+    return shift_up(n), shift_down(s), shift_right(e), shift_left(w)
+
+
+def evolve_hpp_board(initial_state: np.ndarray, timesteps: int) -> np.ndarray:
+    """
+    Evolves the HPP board and returns the full history.
+
+    Uses the Numba kernel when available, otherwise the bit-plane stepper.
+
+    Returns:
+        A 3D NumPy array of shape (timesteps, HEIGHT, WIDTH), where frame 0
+        is the initial state.
+    """
+    history = np.empty((max(timesteps, 1), HEIGHT, WIDTH), dtype=np.uint8)
+    board = np.array(initial_state, dtype=np.uint8)
+    history[0] = board
+    if HAVE_NUMBA:
+        out = np.empty_like(board)
+        for t in range(1, timesteps):
+            step_hpp_board(board, out)
+            board, out = out, board
+            history[t] = board
+    else:
+        planes = pack_hpp_planes(board)
+        for t in range(1, timesteps):
+            planes = step_hpp_planes(planes)
+            unpack_hpp_planes(planes, history[t])
+    return history
 
 
 def create_hpp_board_np(density: float = 0.5, initial_state: Optional[np.ndarray] = None) -> np.ndarray:
@@ -122,37 +182,56 @@ def create_hpp_board_np(density: float = 0.5, initial_state: Optional[np.ndarray
     based on the density.
     """
     if initial_state is not None:
-        #take initial board, provide random particles movements
-        for r in range(HEIGHT):
-            for c in range(WIDTH):
-                if initial_state[r, c] != EMPTY:
-                    #random particle type to the occupied cell
-                    initial_state[r, c] = random.choice([W_PARTICLE, E_PARTICLE, S_PARTICLE, N_PARTICLE])
+        #take initial board, give every occupied cell a random particle type
+        occupied = initial_state != EMPTY
+        initial_state[occupied] = np.random.choice(PLANE_PARTICLES, size=int(occupied.sum()))
         return initial_state
 
     log(f"HPP: Creating new NumPy board with particle density {density}")
-    board = np.full((HEIGHT, WIDTH), EMPTY, dtype=int)
+    board = np.full((HEIGHT, WIDTH), EMPTY, dtype=np.uint8)
     
     total_cells = WIDTH * HEIGHT
     num_particles = int(total_cells * density)
     
-    # Get a list of all possible single-particle states
-    particle_types = [W_PARTICLE, E_PARTICLE, S_PARTICLE, N_PARTICLE]
-    
-    # Get a list of unique cells to populate
-    cells_to_populate = random.sample(
-        [(r, c) for r in range(HEIGHT) for c in range(WIDTH)], 
-        num_particles
-    )
-    
-    for r, c in cells_to_populate:
-        # Assign a random particle type to the chosen cell
-        board[r, c] = random.choice(particle_types)
+    # Assign a random single-particle state to each of the chosen cells
+    rows, cols = random_cells(num_particles)
+    board[rows, cols] = np.random.choice(PLANE_PARTICLES, size=num_particles)
         
     log(f"HPP: Seeded board with {num_particles} random particles.")
     return board
 
 
+def generate_hpp_frames(initial_state: np.ndarray, timesteps: int = 500):
+    """
+    Yields (i, board, stable) for each generation starting at
+    'initial_state'. 'board' is a copy, so frames can be buffered safely.
+
+    Stops after the first frame whose 'stable' flag is set, i.e. once the
+    board has not changed for 20 steps.
+    """
+    board = initial_state.astype(np.uint8)
+    out = np.empty_like(board)
+    # Without Numba, step the bit-planes and unpack each generation into 'board'
+    planes = None if HAVE_NUMBA else pack_hpp_planes(board)
+    stable_counter = 0
+    for i in range(timesteps):
+        if i > 0:
+            if planes is None:
+                step_hpp_board(board, out)
+                changed = not np.array_equal(board, out)
+                board, out = out, board
+            else:
+                next_planes = step_hpp_planes(planes)
+                changed = next_planes != planes
+                planes = next_planes
+                if changed:
+                    unpack_hpp_planes(planes, board)
+            stable_counter = 0 if changed else stable_counter + 1
+        stable = stable_counter >= 20
+        yield i, board.copy(), stable
+        if stable:
+            return
+
 def run_hpp_simulation(
     initial_state: Optional[np.ndarray] = None,
     density: float = 0.5,
@@ -161,52 +240,27 @@ def run_hpp_simulation(
     which: str = 'both'
 ):
     """
-    Runs the HPP Lattice Gas Automaton simulation using cellpylib.
+    Runs the HPP Lattice Gas Automaton simulation on the LED matrix.
     """
     log(f"HPP: Starting simulation. density={density}, steps={timesteps}")
     
     # Use the create function, which respects the initial_state override
     initial_state_2d = create_hpp_board_np(density, initial_state)
     
-    # Wrap in 3D array for cellpylib's evolve2d function
-    initial_state_3d = np.array([initial_state_2d]) 
-    
-    log(f"HPP: Evolving {timesteps} steps...")
-    
-    # Evolve the cellular automaton
-    all_generations = cpl.evolve2d(
-        cellular_automaton=initial_state_3d,
-        timesteps=timesteps,
-        neighbourhood='Moore', # We need N,S,E,W neighbors
-        apply_rule=hpp_lga_rule,
-        r=1 # Radius 1
-    )
-    
-    log(f"HPP: Evolution complete. Result shape: {all_generations.shape}")
-    
+    # Generations are computed on a background thread while the current
+    # frame is on screen, and the producer stops once the board is stable.
     try:
-        stable_counter = 0
-        total_frames = all_generations.shape[0]
-
-        for i in range(total_frames):            
-            current_board_np = all_generations[i]            
-            current_board_list = current_board_np.tolist()            
-            
-            # Draw the state to the LED matrix
-            draw_hpp_board(current_board_list, which)
+        redraw = RedrawGate()
+        for i, board, stable in prefetch_frames(generate_hpp_frames(initial_state_2d, timesteps)):
+            # Draw the state to the LED matrix (skipped if nothing changed)
+            if redraw.needs_draw(board):
+                draw_hpp_board(board, which)
             time.sleep(delay_sec)
             
-            if i % 20 == 0 or i == total_frames - 1:
+            if i % 20 == 0 or i == timesteps - 1:
                 log(f"HPP: Step {i}/{timesteps}.")
 
-            # Check for stable state (gridlock or empty)
-            if i > 0:
-                if np.array_equal(current_board_np, all_generations[i-1]):
-                    stable_counter += 1
-                else:
-                    stable_counter = 0
-            
-            if stable_counter >= 20:
+            if stable:
                 log("HPP: State stable for 20 steps. Halting.")
                 time.sleep(2)
                 break
@@ -222,10 +276,10 @@ def run_test_hpp():
     """
     Test function to run a sample HPP simulation.
     """
-    matrix = [[0 for _ in range(WIDTH)] for _ in range(HEIGHT)]
-    matrix[HEIGHT // 2][WIDTH // 2] = N_PARTICLE | S_PARTICLE
-    matrix[HEIGHT // 2][(WIDTH // 2) - 1] = E_PARTICLE | W_PARTICLE
-    board = create_hpp_board_np(initial_state=np.array(matrix))
+    matrix = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    matrix[HEIGHT // 2, WIDTH // 2] = N_PARTICLE | S_PARTICLE
+    matrix[HEIGHT // 2, (WIDTH // 2) - 1] = E_PARTICLE | W_PARTICLE
+    board = create_hpp_board_np(initial_state=matrix)
     try:
         run_hpp_simulation(
             initial_state=board,
@@ -0,0 +1,61 @@
+"""
+bitboard.py
+
+Helpers for storing a (HEIGHT, WIDTH) boolean board as one 306-bit Python
+int. Bit (r * WIDTH + c) is set if cell (r, c) is set, so a single bitwise
+op updates every cell of the board at once (SWAR).
+
+This is the same bit order as the 'drawbw' payload: bb.to_bytes(BOARD_BYTES,
+'little') is the 39-byte frame create_matrix() would build.
+"""
+
+import numpy as np
+from framework_led_matrix.core.led_commands import WIDTH, HEIGHT
+
+CELLS = HEIGHT * WIDTH
+BOARD_BYTES = (CELLS + 7) // 8
+ALL_CELLS = (1 << CELLS) - 1
+TOP_ROW = (1 << WIDTH) - 1
+BOTTOM_ROW = TOP_ROW << (WIDTH * (HEIGHT - 1))
+LEFT_COL = sum(1 << (r * WIDTH) for r in range(HEIGHT))
+RIGHT_COL = LEFT_COL << (WIDTH - 1)
+
+
+def pack_board(mask: np.ndarray) -> int:
+    """Packs a (HEIGHT, WIDTH) array into a bitboard (non-zero cells are set)."""
+    flat = np.asarray(mask).ravel() != 0
+    return int.from_bytes(np.packbits(flat, bitorder='little').tobytes(), 'little')
+
+
+def unpack_bits(boards) -> np.ndarray:
+    """Unpacks a sequence of bitboards into a (len(boards), CELLS) 0/1 uint8 array."""
+    raw = np.frombuffer(b''.join(bb.to_bytes(BOARD_BYTES, 'little') for bb in boards), dtype=np.uint8)
+    return np.unpackbits(raw, bitorder='little').reshape(len(boards), -1)[:, :CELLS]
+
+
+def unpack_board(bb: int, out: np.ndarray):
+    """Unpacks a bitboard into a (HEIGHT, WIDTH) array of 0/1."""
+    out[...] = unpack_bits((bb,)).reshape(HEIGHT, WIDTH)
+
+
+# Shifts move every cell one step in a direction, wrapping at the edges.
+# Rows are WIDTH bits apart, columns 1 bit apart.
+
+def shift_up(bb: int) -> int:
+    """Cell (r, c) takes the value of (r + 1, c)."""
+    return (bb >> WIDTH) | ((bb & TOP_ROW) << (WIDTH * (HEIGHT - 1)))
+
+
+def shift_down(bb: int) -> int:
+    """Cell (r, c) takes the value of (r - 1, c)."""
+    return ((bb << WIDTH) & ALL_CELLS) | (bb >> (WIDTH * (HEIGHT - 1)))
+
+
+def shift_right(bb: int) -> int:
+    """Cell (r, c) takes the value of (r, c - 1)."""
+    return ((bb & ~RIGHT_COL) << 1) | ((bb & RIGHT_COL) >> (WIDTH - 1))
+
+
+def shift_left(bb: int) -> int:
+    """Cell (r, c) takes the value of (r, c + 1)."""
+    return ((bb & ~LEFT_COL) >> 1) | ((bb & LEFT_COL) << (WIDTH - 1))
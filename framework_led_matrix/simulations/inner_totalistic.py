@@ -1,6 +1,6 @@
 import numpy as np
-import cellpylib as cpl
 from framework_led_matrix.core.led_commands import log, WIDTH, HEIGHT
+from framework_led_matrix.core.accel import njit, HAVE_NUMBA
 
 
 
@@ -11,6 +11,60 @@ def create_simple_state(k: int = 2, val: int = 1) -> np.ndarray:
     board[HEIGHT // 2, WIDTH // 2] = val
     return board
 
+# Offsets of the 3x3 Moore neighbourhood, centre included, as (row, col) shifts
+_MOORE_OFFSETS_WITH_CENTRE = tuple((dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1))
+
+
+def make_totalistic_table(rule_number: int) -> np.ndarray:
+    """
+    Turns a k=2 NKS rule number into a 10-entry uint8 table indexed by the
+    3x3 neighbourhood sum (0-9): bit 'sum' of the rule is the next state.
+    """
+    if not 0 <= rule_number < 1 << 10:
+        raise ValueError("rule number out of range")
+    return np.array([(rule_number >> total) & 1 for total in range(10)], dtype=np.uint8)
+
+
+@njit(cache=True, boundscheck=False)
+def _step_totalistic_jit(board, out, table):
+    # One pass over the board: sum each cell's wrapped 3x3 neighbourhood,
+    # then look the sum up in the rule table.
+    height, width = board.shape
+    for r in range(height):
+        rn = height - 1 if r == 0 else r - 1
+        rs = 0 if r == height - 1 else r + 1
+        for c in range(width):
+            cw = width - 1 if c == 0 else c - 1
+            ce = 0 if c == width - 1 else c + 1
+            n = (board[rn, cw] + board[rn, c] + board[rn, ce]
+                 + board[r, cw] + board[r, c] + board[r, ce]
+                 + board[rs, cw] + board[rs, c] + board[rs, ce])
+            out[r, c] = table[n]
+
+
+def _step_totalistic_np(board, out, table):
+    total = np.zeros(board.shape, dtype=np.uint8)
+    for dr, dc in _MOORE_OFFSETS_WITH_CENTRE:
+        total += np.roll(board, (dr, dc), axis=(0, 1))
+    np.take(table, total, out=out)
+
+
+def step_totalistic(board: np.ndarray, out: np.ndarray, table: np.ndarray):
+    """
+    Computes the next k=2 totalistic generation for the whole board at once.
+
+    Args:
+        board: The 2D (HEIGHT, WIDTH) uint8 array of 0/1 cells.
+        out: A preallocated uint8 array of the same shape that receives the
+             next generation. Must not be `board`.
+        table: Rule table from make_totalistic_table().
+    """
+    if HAVE_NUMBA:
+        _step_totalistic_jit(board, out, table)
+    else:
+        _step_totalistic_np(board, out, table)
+
+
 def run_totalistic_ca(initial_state: np.ndarray, timesteps: int, rule_number: int) -> np.ndarray:
     """
     Runs a k=2 (binary) totalistic CA for 'timesteps'.
@@ -19,23 +73,20 @@ def run_totalistic_ca(initial_state: np.ndarray, timesteps: int, rule_number: in
     'rule_number' is the NKS-style rule number for k=2.
     
     Returns:
-        A 3D NumPy array of shape (timesteps + 1, HEIGHT, WIDTH)
+        A 3D uint8 NumPy array of shape (timesteps, HEIGHT, WIDTH); frame 0
+        is the initial state.
     """
-    k = 2
     log(f"Totalistic CA (k=2): Running (rule={rule_number}) for {timesteps} steps.")
     
-    rule_func = lambda n, c_coord, t: cpl.totalistic_rule(n, k=k, rule=rule_number)
+    table = make_totalistic_table(rule_number)
     
-    initial_state_3d = np.array([initial_state])
-    
-    all_generations = cpl.evolve2d(
-        cellular_automaton=initial_state_3d,
-        timesteps=timesteps,
-        neighbourhood='Moore',
-        apply_rule=rule_func
-    )
-    return all_generations
-
+    # k=2: the rule table is indexed by the 9-cell sum, so cells must be 0/1
+    initial_state = (np.asarray(initial_state) == 1).astype(np.uint8)
+    history = np.empty((max(timesteps, 1),) + initial_state.shape, dtype=np.uint8)
+    history[0] = initial_state
+    for t in range(1, history.shape[0]):
+        step_totalistic(history[t - 1], history[t], table)
+    return history
 
 if __name__ == "__main__":
     # Test block
@@ -1,30 +1,40 @@
 import numpy as np
-import cellpylib as cpl
-from framework_led_matrix.core.led_commands import log, WIDTH, HEIGHT, coordinates_to_matrix
+from framework_led_matrix.core.led_commands import log, WIDTH, HEIGHT
+from framework_led_matrix.core.accel import njit, HAVE_NUMBA
+from framework_led_matrix.simulations.bitboard import ALL_CELLS, pack_board, unpack_board, shift_up, shift_down, shift_left, shift_right
 
+def _preset_board(coordinates) -> np.ndarray:
+    """Renders a list of live (row, col) cells into a read-only uint8 board."""
+    board = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    rows, cols = np.array(coordinates).T
+    board[rows, cols] = 1
+    board.setflags(write=False)
+    return board
+
+
+# Rendered once at import; callers copy them (e.g. np.array(board)) to evolve
 STARTING_STATES_GOF = {
-    "blinker": coordinates_to_matrix([[17, 3], [17, 4], [17, 5]]),
-    "toad": coordinates_to_matrix([[17, 3], [17, 4], [17, 5], [18, 2], [18, 3], [18, 4]]),
-    "pentadecathlon": coordinates_to_matrix([
+    "blinker": _preset_board([[17, 3], [17, 4], [17, 5]]),
+    "toad": _preset_board([[17, 3], [17, 4], [17, 5], [18, 2], [18, 3], [18, 4]]),
+    "pentadecathlon": _preset_board([
         [12, 4], [13, 4], [14, 2], [14, 4], [14, 6], [15, 4], [16, 4],
         [17, 4], [18, 4], [19, 2], [19, 4], [19, 6], [20, 4], [21, 4]
     ]),
-    "glider": coordinates_to_matrix([[1, 2], [2, 3], [3, 1], [3, 2], [3, 3]]),
-    "lwss": coordinates_to_matrix([
+    "glider": _preset_board([[1, 2], [2, 3], [3, 1], [3, 2], [3, 3]]),
+    "lwss": _preset_board([
         [17, 3], [17, 5], [18, 2], [19, 2], [19, 5],
         [20, 2], [20, 3], [20, 4], [20, 5]
     ]),
-    "r_pentomino": coordinates_to_matrix([[17, 4], [17, 5], [18, 3], [18, 4], [19, 4]]),
-    "diehard": coordinates_to_matrix([
+    "r_pentomino": _preset_board([[17, 4], [17, 5], [18, 3], [18, 4], [19, 4]]),
+    "diehard": _preset_board([
         [17, 7], [18, 1], [18, 2], [19, 2], [19, 5], [19, 6], [19, 7]
     ]),
-    "acorn": coordinates_to_matrix([
+    "acorn": _preset_board([
         [17, 2], [18, 4], [19, 1], [19, 2], [19, 5], [19, 6], [19, 7]
     ]),
-    "block": coordinates_to_matrix([[17, 3], [17, 4], [18, 3], [18, 4]]),
-    "beehive": coordinates_to_matrix([[17, 3], [17, 4], [18, 2], [18, 5], [19, 3], [19, 4]]),
-    "r_pentomino": coordinates_to_matrix([[17, 4], [17, 5], [18, 3], [18, 4], [19, 4]]),
-    "rabbit": coordinates_to_matrix([[17, 3], [17, 4], [18, 2], [18, 5], [19, 5], [20, 5]])
+    "block": _preset_board([[17, 3], [17, 4], [18, 3], [18, 4]]),
+    "beehive": _preset_board([[17, 3], [17, 4], [18, 2], [18, 5], [19, 3], [19, 4]]),
+    "rabbit": _preset_board([[17, 3], [17, 4], [18, 2], [18, 5], [19, 5], [20, 5]])
 }
 
 
@@ -44,6 +54,115 @@ NAMED_RULES = {
 }
     
 
+# Offsets of the 8 Moore neighbours, as (row, col) shifts
+_MOORE_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def make_rule_tables(b_rule: list[int], s_rule: list[int]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Turns B/S rule lists into two 9-entry boolean tables indexed by the
+    live-neighbour count (0-8): (birth, survive).
+    """
+    birth = np.zeros(9, dtype=bool)
+    survive = np.zeros(9, dtype=bool)
+    birth[list(b_rule)] = True
+    survive[list(s_rule)] = True
+    return birth, survive
+
+
+@njit(cache=True, boundscheck=False)
+def _step_outer_totalistic_jit(board, out, birth, survive):
+    # One pass over the board: count each cell's 8 wrapped neighbours
+    # in place, then look the count up in the rule table.
+    height, width = board.shape
+    for r in range(height):
+        rn = height - 1 if r == 0 else r - 1
+        rs = 0 if r == height - 1 else r + 1
+        for c in range(width):
+            cw = width - 1 if c == 0 else c - 1
+            ce = 0 if c == width - 1 else c + 1
+            n = (board[rn, cw] + board[rn, c] + board[rn, ce]
+                 + board[r, cw] + board[r, ce]
+                 + board[rs, cw] + board[rs, c] + board[rs, ce])
+            if board[r, c] == 1:
+                out[r, c] = 1 if survive[n] else 0
+            else:
+                out[r, c] = 1 if birth[n] else 0
+
+
+def _step_outer_totalistic_np(board, out, birth, survive):
+    # Weight the centre by 9 so one index encodes (alive, count):
+    # 0-8 is a dead cell with that many neighbours, 9-17 a live one
+    index = board * np.uint8(9)
+    for dr, dc in _MOORE_OFFSETS:
+        index += np.roll(board, (dr, dc), axis=(0, 1))
+    np.take(np.concatenate((birth, survive)).astype(out.dtype), index, out=out)
+
+
+def step_outer_totalistic(board: np.ndarray, out: np.ndarray, birth: np.ndarray, survive: np.ndarray):
+    """
+    Computes the next B/S generation for the whole board at once.
+
+    Each cell counts its 8 neighbours (the board wraps around), then looks
+    the count up in the birth table if dead or the survive table if alive.
+    Uses a Numba kernel when available, otherwise sums shifted copies of
+    the board with NumPy.
+
+    Args:
+        board: The 2D (HEIGHT, WIDTH) uint8 array of 0/1 cells.
+        out: A preallocated uint8 array of the same shape that receives the
+             next generation. Must not be `board`.
+        birth, survive: Rule tables from make_rule_tables().
+    """
+    if HAVE_NUMBA:
+        _step_outer_totalistic_jit(board, out, birth, survive)
+    else:
+        _step_outer_totalistic_np(board, out, birth, survive)
+
+
+# --- Bitboard (SWAR) representation ---
+# The whole board is one bitboard (see bitboard.py). Neighbour counts are
+# kept bit-sliced in four bitboards (1s, 2s, 4s and 8s digit of every
+# cell's count), so one pass of adds counts all 306 cells at once.
+
+def _count_equals(digits: tuple, n: int) -> int:
+    """Bitboard of cells whose bit-sliced neighbour count equals n."""
+    match = ALL_CELLS
+    for bit, digit in enumerate(digits):
+        match &= digit if n >> bit & 1 else ~digit
+    return match
+
+
+def step_outer_totalistic_bits(bb: int, b_rule: tuple, s_rule: tuple) -> int:
+    """
+    Computes the next B/S generation of a bitboard, branch-free per cell.
+
+    Each of the 8 wrapped neighbour shifts is added into the bit-sliced
+    count with a ripple of half-adders; the rule then selects the cells
+    whose count is in 'b_rule' (dead cells) or 's_rule' (live cells).
+    """
+    up, down = shift_up(bb), shift_down(bb)
+    neighbours = (up, down, shift_left(bb), shift_right(bb),
+                  shift_left(up), shift_right(up), shift_left(down), shift_right(down))
+
+    c1 = c2 = c4 = c8 = 0
+    for x in neighbours:
+        carry = c1 & x
+        c1 ^= x
+        carry, c2 = c2 & carry, c2 ^ carry
+        carry, c4 = c4 & carry, c4 ^ carry
+        c8 |= carry
+    digits = (c1, c2, c4, c8)
+
+    born = 0
+    for n in b_rule:
+        born |= _count_equals(digits, n)
+    survives = 0
+    for n in s_rule:
+        survives |= _count_equals(digits, n)
+    return (born & ~bb & ALL_CELLS) | (survives & bb)
+
+
 def run_outer_totalistic_ca(
     initial_state: np.ndarray, 
     timesteps: int, 
@@ -61,52 +180,27 @@ def run_outer_totalistic_ca(
         s_rule: A list of neighbor counts to "Survive" a live cell (e.g., [2, 3]).
     
     Returns:
-        A 3D NumPy array of shape (timesteps + 1, HEIGHT, WIDTH)
+        A 3D uint8 NumPy array of shape (timesteps, HEIGHT, WIDTH); frame 0
+        is the initial state.
+
+    Uses the Numba kernel when available, otherwise the bitboard stepper.
     """
     log(f"Outer-Totalistic CA: Running B{b_rule}/S{s_rule} for {timesteps} steps.")
     
-    # Use sets for fast 'in' lookups
-    b_set = set(b_rule)
-    s_set = set(s_rule)
+    birth, survive = make_rule_tables(b_rule, s_rule)
     
-    def outer_totalistic_rule(neighbourhood: np.ndarray, c_coord: tuple, t: int) -> int:
-        """
-        The custom 'apply_rule' function that implements B/S logic.
-        
-        Args:
-            neighbourhood: The 2D (3x3) NumPy array (Moore neighborhood).
-            c_coord (tuple): The (row, col) coordinate (unused).
-            t (int): The current timestep (unused).
-        """
-        
-        # Get the 8-neighbor sum (total sum - center cell)
-        neighbor_sum = np.sum(neighbourhood) - neighbourhood[1, 1]
-        
-        # Get the center cell's current state
-        center_val = neighbourhood[1, 1]
-        
-        if center_val == 1:
-            # Cell is ALIVE, check SURVIVAL rule
-            if neighbor_sum in s_set:
-                return 1  # Survive
-            else:
-                return 0  # Die
-        else:
-            # Cell is DEAD, check BIRTH rule
-            if neighbor_sum in b_set:
-                return 1  # Born
-            else:
-                return 0  # Stay dead
-                
-    # Wrap initial state into a 3D array (shape [1, H, W])
-    initial_state_3d = np.array([initial_state])
-    
-    # Evolve and return the history
-    all_generations = cpl.evolve2d(
-        cellular_automaton=initial_state_3d,
-        timesteps=timesteps,
-        neighbourhood='Moore', # B/S rules require the 8-neighbor Moore
-        apply_rule=outer_totalistic_rule
-    )
-    return all_generations
-
+    # Only 1 is a live cell, as in the B/S rule; the steppers count
+    # neighbours by summing cells, so they need a 0/1 board
+    initial_state = (np.asarray(initial_state) == 1).astype(np.uint8)
+    history = np.empty((max(timesteps, 1),) + initial_state.shape, dtype=np.uint8)
+    history[0] = initial_state
+    if HAVE_NUMBA:
+        for t in range(1, history.shape[0]):
+            step_outer_totalistic(history[t - 1], history[t], birth, survive)
+    else:
+        b_rule, s_rule = tuple(b_rule), tuple(s_rule)
+        bb = pack_board(initial_state == 1)
+        for t in range(1, history.shape[0]):
+            bb = step_outer_totalistic_bits(bb, b_rule, s_rule)
+            unpack_board(bb, history[t])
+    return history
@@ -0,0 +1,13 @@
+import numpy as np
+from framework_led_matrix.core.led_commands import WIDTH, HEIGHT
+
+
+def random_cells(count: int):
+    """
+    Picks 'count' distinct random cells of the (HEIGHT, WIDTH) board.
+
+    Returns:
+        A (rows, cols) pair of NumPy index arrays, ready for fancy indexing.
+    """
+    cells = np.random.permutation(HEIGHT * WIDTH)[:count]
+    return np.divmod(cells, WIDTH)
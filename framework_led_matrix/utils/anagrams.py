@@ -1,21 +1,30 @@
 from framework_led_matrix.simulations.outer_totalistic import run_outer_totalistic_ca
 from framework_led_matrix.core.led_commands import start_animation, stop_animation, reset_modules, log
 from framework_led_matrix.utils.text_rendering import draw_text_vertical
+from nltk.corpus import words
+from collections import defaultdict
+import functools
 import nltk
 import time
 
+# Set once the 'words' corpus has been found (or downloaded) in this process
+_corpus_ready = False
+
 def ensure_nltk_words():
-    """Ensures the 'words' corpus is downloaded."""
+    """Ensures the 'words' corpus is downloaded. Only checks once per process."""
+    global _corpus_ready
+    if _corpus_ready:
+        return
     try:
         nltk.data.find('corpora/words')
     except (LookupError, AttributeError):
         log("NLTK 'words' corpus not found. Downloading...")
         nltk.download('words', quiet=True)
+    _corpus_ready = True
 
 def draw_anagram_on_matrix(word: str, which: str = 'both', animate: bool = True):
     """Draws an anagram of the given word on the LED matrix."""
     log(f"draw_anagram_on_matrix: start word='{word}' which={which}")
-    ensure_nltk_words()
     ana_lst = anagrams(word)
     ana_lst.add(word)
     ana_lst = list(ana_lst)
@@ -31,9 +40,41 @@ def draw_anagram_on_matrix(word: str, which: str = 'both', animate: bool = True)
     log("draw_anagram_on_matrix: finished rendering all anagrams, resetting modules")
     reset_modules()
 
+@functools.lru_cache(maxsize=1)
+def _get_words_by_length():
+    """
+    Buckets the corpus by word length once (anagrams always share a length).
+    """
+    ensure_nltk_words()
+    by_length = defaultdict(list)
+    for w in words.words():
+        by_length[len(w)].append(w)
+    log(f"_get_words_by_length: bucketed corpus into {len(by_length)} lengths")
+    return by_length
+
+@functools.lru_cache(maxsize=None)
+def words_up_to_length(max_length: int):
+    """
+    Returns the corpus words with at most 'max_length' letters, grouped by
+    length. Built from the length buckets, so the corpus is not rescanned.
+    """
+    by_length = _get_words_by_length()
+    return tuple(w for length in sorted(by_length) if length <= max_length for w in by_length[length])
+
+@functools.lru_cache(maxsize=None)
+def _get_signature_map(length: int):
+    """
+    Builds the anagram index for one word length, on first use:
+    sorted-letter signature -> corpus words of that length.
+    """
+    signature_map = defaultdict(list)
+    for w in _get_words_by_length().get(length, ()):
+        signature_map["".join(sorted(w))].append(w)
+    log(f"_get_signature_map: indexed {len(signature_map)} signatures of length {length}")
+    return signature_map
+
 def anagrams(word):
     log(f"anagrams: finding anagrams for '{word}'")
-    word_sorted = sorted(word)
-    result = set(w for w in words.words() if sorted(w) == word_sorted)
+    result = set(_get_signature_map(len(word)).get("".join(sorted(word)), []))
     log(f"anagrams: found {len(result)} candidates")
-    return result
\ No newline at end of file
+    return result
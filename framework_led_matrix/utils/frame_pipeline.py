@@ -0,0 +1,92 @@
+"""
+frame_pipeline.py
+
+Runs a frame generator on a background thread so the next frames are
+computed while the current one is on screen (during the run loop's
+time.sleep), instead of after it, and lets run loops skip redrawing
+frames that are already on the LEDs.
+"""
+
+import queue
+import threading
+from typing import Iterable, Iterator, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+_DONE = object()
+
+
+class RedrawGate:
+    """
+    Remembers the last frame a run loop drew, so frames identical to it
+    (still lifes, gridlock, stable gas) are not sent to the LEDs again.
+    """
+    __slots__ = ('_last',)
+
+    def __init__(self):
+        self._last = None
+
+    def needs_draw(self, frame) -> bool:
+        """True if 'frame' differs from the last frame drawn; it is then recorded as drawn."""
+        frame = np.asarray(frame)
+        if self._last is not None and np.array_equal(frame, self._last):
+            return False
+        # A copy, since callers often reuse their frame buffers
+        self._last = frame.copy()
+        return True
+
+
+class _ProducerError:
+    """Carries an exception raised by the producer over to the consumer."""
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def prefetch_frames(frames: Iterable[T], maxsize: int = 8) -> Iterator[T]:
+    """
+    Iterates 'frames' on a daemon thread, buffering up to 'maxsize' items.
+
+    Items are yielded in order. Exceptions raised by the producer are
+    re-raised in the consumer. Closing the returned iterator (e.g. by
+    leaving a for-loop early) stops the producer.
+
+    The producer must yield independent objects (e.g. board copies), not a
+    buffer it keeps mutating.
+    """
+    buffer: "queue.Queue" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        # Block until there is room, but give up once the consumer has gone
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for frame in frames:
+                if not put(frame):
+                    return
+        except BaseException as e:
+            put(_ProducerError(e))
+            return
+        put(_DONE)
+
+    worker = threading.Thread(target=produce, name="frame-producer", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _ProducerError):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
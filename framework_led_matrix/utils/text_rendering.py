@@ -1,10 +1,29 @@
+import functools
 from framework_led_matrix.core.led_commands import log, draw_matrix_on_board, WIDTH, HEIGHT
 from PIL import Image, ImageDraw, ImageFont
+import numpy as np
 
 
 
 DEFAULT_FONT_PATH = "/usr/share/fonts/TTF/DejaVuSansMono.ttf"
 
+
+def _blit(src: np.ndarray, top: int, left: int) -> tuple[np.ndarray, int]:
+    """
+    Copies the 2D 'src' into a blank (HEIGHT, WIDTH) matrix with its
+    top-left corner at (top, left), clipping whatever falls outside.
+
+    Returns:
+        The uint8 matrix and the number of source pixels that landed on it.
+    """
+    matrix = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    r0, c0 = max(top, 0), max(left, 0)
+    r1, c1 = min(top + src.shape[0], HEIGHT), min(left + src.shape[1], WIDTH)
+    if r0 < r1 and c0 < c1:
+        matrix[r0:r1, c0:c1] = src[r0 - top:r1 - top, c0 - left:c1 - left]
+        return matrix, (r1 - r0) * (c1 - c0)
+    return matrix, 0
+
 def get_font_size(word_length: int) -> int:
     """
     Gets an appropriate font size for rendering a word vertically
@@ -44,238 +63,111 @@ def get_font_size(word_length: int) -> int:
     return SIZE_MAP.get(word_length, 4)
 
 
-def get_matrix_from_text_vertical(text: str, font_size: int | None = None, row_offset: int = 0):
-    log(f"get_matrix_from_text_vertical: rendering '{text}' requested_size={font_size} row_offset={row_offset}")
-    if font_size is None:
-        font_size = get_font_size(len(text))
-        log(f"get_matrix_from_text_vertical: computed font_size={font_size} using get_font_size(len(text)={len(text)})")
+@functools.lru_cache(maxsize=None)
+def _load_font(font_size: int):
+    """Loads DEFAULT_FONT_PATH at 'font_size' (PIL's default font if missing), once per size."""
     try:
-        font = ImageFont.truetype(DEFAULT_FONT_PATH, font_size)
-        log(f"get_matrix_from_text_vertical: truetype font loaded at size {font_size}")
+        return ImageFont.truetype(DEFAULT_FONT_PATH, font_size)
     except IOError:
-        font = ImageFont.load_default()
-        log("get_matrix_from_text_vertical: fallback to default font")
+        log(f"_load_font: fallback to default font for size {font_size}")
+        return ImageFont.load_default()
 
-    #text width must be <= HEIGHT-row_offset, text height <= WIDTH
+
+def _text_size(font, text: str) -> tuple[int, int]:
     try:
         bbox = font.getbbox(text)
-        text_width = bbox[2]
-        text_height = bbox[3]
+        return bbox[2], bbox[3]
     except AttributeError:
-        text_width, text_height = font.getsize(text) # type: ignore
+        return font.getsize(text) # type: ignore
+
+
+def _fit_font(text: str, font_size: int, max_width: int | None, max_height: int):
+    """
+    Shrinks 'font_size' until 'text' fits in max_width x max_height pixels
+    (or the size reaches 1). A max_width of None leaves the width unbounded.
 
-    # If it doesn't fit, reduce font_size until it does (or reaches 1)
-    while (text_height > WIDTH or text_width > (HEIGHT - row_offset)) and font_size > 1:
+    Returns:
+        (font, font_size, text_width, text_height) for the size chosen.
+    """
+    font = _load_font(font_size)
+    text_width, text_height = _text_size(font, text)
+    while (text_height > max_height or (max_width is not None and text_width > max_width)) and font_size > 1:
         font_size -= 1
-        try:
-            font = ImageFont.truetype(DEFAULT_FONT_PATH, font_size)
-        except IOError:
-            font = ImageFont.load_default()
-        try:
-            bbox = font.getbbox(text)
-            text_width = bbox[2]
-            text_height = bbox[3]
-        except AttributeError:
-            text_width, text_height = font.getsize(text) # type: ignore
+        font = _load_font(font_size)
+        text_width, text_height = _text_size(font, text)
+    return font, font_size, text_width, text_height
 
-    log(f"get_matrix_from_text_vertical: final font_size={font_size} bbox_w={text_width} bbox_h={text_height}")
+
+def _rasterize(text: str, font, text_width: int, text_height: int) -> np.ndarray:
+    """Draws 'text' into a text_width x text_height 1-bit image and returns it as a 0/1 uint8 array."""
     temp_image = Image.new('1', (text_width, text_height), 0) # type: ignore
     draw = ImageDraw.Draw(temp_image)
     draw.text((0, 0), text, font=font, fill=1)
+    return np.asarray(temp_image, dtype=np.uint8)
 
-    matrix = [[0] * WIDTH for _ in range(HEIGHT)]
-    
-    col_offset = (WIDTH - text_height) // 2
-    pixels_mapped = 0
-    
-    for x in range(text_width): # type: ignore
-        for y in range(text_height): # type: ignore
-            matrix_row = (text_width - 1 - x) + row_offset
-            matrix_col = col_offset + y
 
-            if not (0 <= matrix_row < HEIGHT and 0 <= matrix_col < WIDTH):
-                continue
+# Rendering is a pure function of its arguments, so the results are cached
+# (read-only); the public functions hand out copies.
 
-            matrix[matrix_row][matrix_col] = temp_image.getpixel((x, y)) # type: ignore
-            pixels_mapped += 1
+@functools.lru_cache(maxsize=512)
+def _render_text_vertical(text: str, font_size: int, row_offset: int) -> np.ndarray:
+    #text width must be <= HEIGHT-row_offset, text height <= WIDTH
+    font, font_size, text_width, text_height = _fit_font(text, font_size, HEIGHT - row_offset, WIDTH)
 
-    log(f"get_matrix_from_text_vertical: mapped {pixels_mapped} pixels to matrix")
-    return matrix
+    log(f"_render_text_vertical: final font_size={font_size} bbox_w={text_width} bbox_h={text_height}")
+    glyph = _rasterize(text, font, text_width, text_height)
 
-def get_matrix_from_text_horizontal(text: str, font_size: int | None = None, x_offset: int = 0, y_offset: int = 0):
-    log(f"get_matrix_from_text_horizontal: rendering '{text}' requested_size={font_size} x_offset={x_offset} y_offset={y_offset}")
-    if font_size is None:
-        font_size = get_font_size(len(text))
-        log(f"get_matrix_from_text_horizontal: computed font_size={font_size} using get_font_size(len(text)={len(text)})")
+    col_offset = (WIDTH - text_height) // 2
+    # Rotate the text 90 degrees so it reads bottom-to-top along the long axis
+    matrix, pixels_mapped = _blit(glyph.T[::-1], row_offset, col_offset)
 
-    try:
-        font = ImageFont.truetype(DEFAULT_FONT_PATH, font_size)
-        log(f"get_matrix_from_text_horizontal: truetype font loaded at size {font_size}")
-    except IOError:
-        font = ImageFont.load_default()
-        log("get_matrix_from_text_horizontal: fallback to default font")
+    log(f"_render_text_vertical: mapped {pixels_mapped} pixels to matrix")
+    matrix.setflags(write=False)
+    return matrix
 
-    try:
-        bbox = font.getbbox(text)
-        text_width = bbox[2]
-        text_height = bbox[3]
-    except AttributeError:
-        text_width, text_height = font.getsize(text) # type: ignore
 
-    #If text height is too tall for the matrix, reduce font_size until it fits
-    while text_height > HEIGHT and font_size > 1:
-        font_size -= 1
-        try:
-            font = ImageFont.truetype(DEFAULT_FONT_PATH, font_size)
-        except IOError:
-            font = ImageFont.load_default()
-        try:
-            bbox = font.getbbox(text)
-            text_width = bbox[2]
-            text_height = bbox[3]
-        except AttributeError:
-            text_width, text_height = font.getsize(text) # type: ignore
+@functools.lru_cache(maxsize=512)
+def _render_text_horizontal(text: str, font_size: int, x_offset: int, y_offset: int) -> np.ndarray:
+    #Only the height has to fit; text wider than the matrix is clipped
+    font, font_size, text_width, text_height = _fit_font(text, font_size, None, HEIGHT)
 
-    log(f"get_matrix_from_text_horizontal: final font_size={font_size} bbox_w={text_width} bbox_h={text_height}")
-    temp_image = Image.new('1', (text_width, text_height), 0) # type: ignore
-    draw = ImageDraw.Draw(temp_image)
-    draw.text((0, 0), text, font=font, fill=1)
+    log(f"_render_text_horizontal: final font_size={font_size} bbox_w={text_width} bbox_h={text_height}")
+    glyph = _rasterize(text, font, text_width, text_height)
     
-    matrix = [[0] * WIDTH for _ in range(HEIGHT)]
-
     if y_offset == 0:
          y_offset = (HEIGHT - text_height) // 2 # type: ignore
     
-    pixels_mapped = 0
-    for matrix_col in range(WIDTH):
-        for matrix_row in range(HEIGHT):
-            source_x = matrix_col + x_offset
-            source_y = matrix_row - y_offset
-            
-            if not (0 <= source_x < text_width and 0 <= source_y < text_height):
-                continue
-            matrix[matrix_row][matrix_col] = temp_image.getpixel((source_x, source_y)) # type: ignore
-            pixels_mapped += 1
+    matrix, pixels_mapped = _blit(glyph, y_offset, -x_offset)
 
-    log(f"get_matrix_from_text_horizontal: mapped {pixels_mapped} pixels to matrix")
+    log(f"_render_text_horizontal: mapped {pixels_mapped} pixels to matrix")
+    matrix.setflags(write=False)
     return matrix
 
-def draw_text_vertical(text: str, font_size: int | None = None, which: str = 'both', row_offset: int = 0):
-    log(f"draw_text_vertical: rendering '{text}' requested_size={font_size} which={which} row_offset={row_offset}")
+
+def get_matrix_from_text_vertical(text: str, font_size: int | None = None, row_offset: int = 0):
+    log(f"get_matrix_from_text_vertical: rendering '{text}' requested_size={font_size} row_offset={row_offset}")
     if font_size is None:
         font_size = get_font_size(len(text))
-        log(f"draw_text_vertical: computed font_size={font_size} using get_font_size(len(text)={len(text)})")
-    try:
-        font = ImageFont.truetype(DEFAULT_FONT_PATH, font_size)
-        log(f"draw_text_vertical: truetype font loaded at size {font_size}")
-    except IOError:
-        font = ImageFont.load_default()
-        log("draw_text_vertical: fallback to default font")
-
-    #text width must be <= HEIGHT-row_offset, text height <= WIDTH
-    try:
-        bbox = font.getbbox(text)
-        text_width = bbox[2]
-        text_height = bbox[3]
-    except AttributeError:
-        text_width, text_height = font.getsize(text) # type: ignore
-
-    # If it doesn't fit, reduce font_size until it does (or reaches 1)
-    while (text_height > WIDTH or text_width > (HEIGHT - row_offset)) and font_size > 1:
-        font_size -= 1
-        try:
-            font = ImageFont.truetype(DEFAULT_FONT_PATH, font_size)
-        except IOError:
-            font = ImageFont.load_default()
-        try:
-            bbox = font.getbbox(text)
-            text_width = bbox[2]
-            text_height = bbox[3]
-        except AttributeError:
-            text_width, text_height = font.getsize(text) # type: ignore
-
-    log(f"draw_text_vertical: final font_size={font_size} bbox_w={text_width} bbox_h={text_height}")
-    temp_image = Image.new('1', (text_width, text_height), 0) # type: ignore
-    draw = ImageDraw.Draw(temp_image)
-    draw.text((0, 0), text, font=font, fill=1)
-
-    matrix = [[0] * WIDTH for _ in range(HEIGHT)]
-    
-    col_offset = (WIDTH - text_height) // 2
-    pixels_mapped = 0
-    
-    for x in range(text_width): # type: ignore
-        for y in range(text_height): # type: ignore
-            matrix_row = (text_width - 1 - x) + row_offset
-            matrix_col = col_offset + y
-            
-            if not (0 <= matrix_row < HEIGHT and 0 <= matrix_col < WIDTH):
-                continue
+        log(f"get_matrix_from_text_vertical: computed font_size={font_size} using get_font_size(len(text)={len(text)})")
+    return _render_text_vertical(text, font_size, row_offset).copy()
 
-            matrix[matrix_row][matrix_col] = temp_image.getpixel((x, y)) # type: ignore
-            pixels_mapped += 1
+def get_matrix_from_text_horizontal(text: str, font_size: int | None = None, x_offset: int = 0, y_offset: int = 0):
+    log(f"get_matrix_from_text_horizontal: rendering '{text}' requested_size={font_size} x_offset={x_offset} y_offset={y_offset}")
+    if font_size is None:
+        font_size = get_font_size(len(text))
+        log(f"get_matrix_from_text_horizontal: computed font_size={font_size} using get_font_size(len(text)={len(text)})")
+    return _render_text_horizontal(text, font_size, x_offset, y_offset).copy()
 
-    log(f"draw_text_vertical: mapped {pixels_mapped} pixels to matrix")
+def draw_text_vertical(text: str, font_size: int | None = None, which: str = 'both', row_offset: int = 0):
+    log(f"draw_text_vertical: which={which}")
+    matrix = get_matrix_from_text_vertical(text, font_size, row_offset)
     draw_matrix_on_board(matrix, which)
     log("draw_text_vertical: drawbw sent")
     return matrix
 
 def draw_text_horizontal(text: str, font_size: int | None = None, which: str = 'both', x_offset: int = 0, y_offset: int = 0):
-    log(f"draw_text_horizontal: rendering '{text}' requested_size={font_size} which={which} x_offset={x_offset} y_offset={y_offset}")
-    if font_size is None:
-        font_size = get_font_size(len(text))
-        log(f"draw_text_horizontal: computed font_size={font_size} using get_font_size(len(text)={len(text)})")
-
-    try:
-        font = ImageFont.truetype(DEFAULT_FONT_PATH, font_size)
-        log(f"draw_text_horizontal: truetype font loaded at size {font_size}")
-    except IOError:
-        font = ImageFont.load_default()
-        log("draw_text_horizontal: fallback to default font")
-
-    try:
-        bbox = font.getbbox(text)
-        text_width = bbox[2]
-        text_height = bbox[3]
-    except AttributeError:
-        text_width, text_height = font.getsize(text) # type: ignore
-
-    #If text height is too tall for the matrix, reduce font_size until it fits
-    while text_height > HEIGHT and font_size > 1:
-        font_size -= 1
-        try:
-            font = ImageFont.truetype(DEFAULT_FONT_PATH, font_size)
-        except IOError:
-            font = ImageFont.load_default()
-        try:
-            bbox = font.getbbox(text)
-            text_width = bbox[2]
-            text_height = bbox[3]
-        except AttributeError:
-            text_width, text_height = font.getsize(text) # type: ignore
-
-    log(f"draw_text_horizontal: final font_size={font_size} bbox_w={text_width} bbox_h={text_height}")
-    temp_image = Image.new('1', (text_width, text_height), 0) # type: ignore
-    draw = ImageDraw.Draw(temp_image)
-    draw.text((0, 0), text, font=font, fill=1)
-    
-    matrix = [[0] * WIDTH for _ in range(HEIGHT)]
-
-    if y_offset == 0:
-         y_offset = (HEIGHT - text_height) // 2 # type: ignore
-    
-    pixels_mapped = 0
-    for matrix_col in range(WIDTH):
-        for matrix_row in range(HEIGHT):
-            source_x = matrix_col + x_offset
-            source_y = matrix_row - y_offset
-            
-            if not (0 <= source_x < text_width and 0 <= source_y < text_height):
-                continue
-            matrix[matrix_row][matrix_col] = temp_image.getpixel((source_x, source_y)) # type: ignore
-            pixels_mapped += 1
-
-    log(f"draw_text_horizontal: mapped {pixels_mapped} pixels to matrix")
+    log(f"draw_text_horizontal: which={which}")
+    matrix = get_matrix_from_text_horizontal(text, font_size, x_offset, y_offset)
     draw_matrix_on_board(matrix, which)
     log("draw_text_horizontal: drawbw sent")
     return matrix
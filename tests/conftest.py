@@ -0,0 +1,62 @@
+"""
+Shared helpers for the stepper parity tests.
+
+Each stepper is compared frame for frame with the original cellpylib rule
+it replaced. Tests call the '_np' and '_jit' kernels directly, side by
+side: with Numba installed the '_jit' one is the compiled kernel the app
+runs; without it, accel.njit leaves it as plain Python, which the app
+never uses but which still checks the kernel's logic on these small boards.
+"""
+
+import numpy as np
+import pytest
+
+from framework_led_matrix.core.led_commands import WIDTH, HEIGHT
+
+_histories = {}
+
+
+def _random_board(seed: int, density: float, states=(1,)) -> np.ndarray:
+    """A seeded (HEIGHT, WIDTH) uint8 board: each cell is occupied with
+    probability 'density', by a value drawn from 'states'."""
+    rng = np.random.default_rng(seed)
+    values = rng.choice(np.asarray(states, dtype=np.uint8), size=(HEIGHT, WIDTH))
+    return np.where(rng.random((HEIGHT, WIDTH)) < density, values, 0).astype(np.uint8)
+
+
+def _cellpylib_history(apply_rule, board: np.ndarray, timesteps: int) -> np.ndarray:
+    """
+    Evolves 'board' with cellpylib's evolve2d and the original per-cell
+    'apply_rule' (Moore neighbourhood, r=1). Results are cached per
+    (rule, board, timesteps), since the per-cell rules are slow.
+    """
+    key = (apply_rule, board.tobytes(), timesteps)
+    if key not in _histories:
+        cpl = pytest.importorskip("cellpylib")
+        _histories[key] = cpl.evolve2d(np.array([board], dtype=int), timesteps=timesteps,
+                                       neighbourhood='Moore', apply_rule=apply_rule, r=1)
+    return _histories[key]
+
+
+@pytest.fixture(scope="session")
+def random_board():
+    return _random_board
+
+
+@pytest.fixture(scope="session")
+def cellpylib_history():
+    return _cellpylib_history
+
+
+def _run_stepper(step, board: np.ndarray, timesteps: int, *args) -> np.ndarray:
+    """Builds a history by calling step(previous, out, *args) 'timesteps' - 1 times."""
+    history = np.empty((timesteps,) + board.shape, dtype=np.uint8)
+    history[0] = board
+    for t in range(1, timesteps):
+        step(history[t - 1], history[t], *args)
+    return history
+
+
+@pytest.fixture(scope="session")
+def run_stepper():
+    return _run_stepper
@@ -0,0 +1,35 @@
+"""
+Tests for the cached anagram index, run on a small stand-in corpus so
+NLTK's 'words' data is not needed.
+"""
+
+import types
+
+import pytest
+
+from framework_led_matrix.utils import anagrams as an
+
+CORPUS = ["listen", "silent", "enlist", "tinsel", "inlets", "google", "stone", "tones",
+          "notes", "onset", "a", "I", "at", "ta", "Tab", "bat", "tab", "supercalifragilistic"]
+
+
+@pytest.fixture(autouse=True)
+def small_corpus(monkeypatch):
+    monkeypatch.setattr(an, "words", types.SimpleNamespace(words=lambda: list(CORPUS)))
+    monkeypatch.setattr(an, "_corpus_ready", True)
+    for cached in (an._get_words_by_length, an.words_up_to_length, an._get_signature_map):
+        cached.cache_clear()
+    yield
+    for cached in (an._get_words_by_length, an.words_up_to_length, an._get_signature_map):
+        cached.cache_clear()
+
+
+@pytest.mark.parametrize("word", CORPUS + ["tinsle", "xyz", ""])
+def test_anagrams_match_a_full_corpus_scan(word):
+    # The original implementation: compare sorted letters with every word
+    assert an.anagrams(word) == {w for w in CORPUS if sorted(w) == sorted(word)}
+
+
+def test_words_up_to_length():
+    assert sorted(an.words_up_to_length(3)) == sorted(w for w in CORPUS if len(w) <= 3)
+    assert sorted(an.words_up_to_length(7)) == sorted(w for w in CORPUS if len(w) <= 7)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from framework_led_matrix.core.led_commands import WIDTH, HEIGHT, create_matrix
+from framework_led_matrix.simulations import bitboard
+
+
+def random_board(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 2, size=(HEIGHT, WIDTH), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_pack_unpack_round_trip(seed):
+    board = random_board(seed)
+    out = np.empty_like(board)
+    bitboard.unpack_board(bitboard.pack_board(board), out)
+    np.testing.assert_array_equal(out, board)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_bitboard_is_the_drawbw_payload(seed):
+    board = random_board(seed)
+    bb = bitboard.pack_board(board)
+    assert bb.to_bytes(bitboard.BOARD_BYTES, 'little') == create_matrix(board)
+    assert create_matrix(bb) == create_matrix(board)
+
+
+# Each shift must match np.roll of the board: (r, c) takes the value of
+# the neighbour on the opposite side, wrapping at the edges
+@pytest.mark.parametrize("shift, roll", [
+    (bitboard.shift_up, (-1, 0)),
+    (bitboard.shift_down, (1, 0)),
+    (bitboard.shift_left, (0, -1)),
+    (bitboard.shift_right, (0, 1)),
+])
+@pytest.mark.parametrize("seed", range(5))
+def test_shifts_wrap_like_np_roll(shift, roll, seed):
+    board = random_board(seed)
+    out = np.empty_like(board)
+    bitboard.unpack_board(shift(bitboard.pack_board(board)), out)
+    np.testing.assert_array_equal(out, np.roll(board, roll, axis=(0, 1)))
@@ -0,0 +1,56 @@
+"""
+Parity tests for the BML traffic steppers.
+
+The reference is the original cellpylib rule: odd half-steps move red
+cars right, even ones move blue cars down.
+"""
+
+import numpy as np
+import pytest
+
+from framework_led_matrix.simulations import BihamMiddletonLevineTrafficModel as bml
+
+TIMESTEPS = 40
+DENSITIES = (0.2, 0.35, 0.5, 0.7)
+
+
+def bml_rule(neighbourhood, c_coord, t):
+    """The original per-cell cellpylib rule."""
+    north, west, centre = neighbourhood[0, 1], neighbourhood[1, 0], neighbourhood[1, 1]
+    east, south = neighbourhood[1, 2], neighbourhood[2, 1]
+    if t == 0:
+        return centre
+    if t % 2 == 1:
+        if centre == bml.BML_RED_RIGHT:
+            return bml.BML_EMPTY if east == bml.BML_EMPTY else bml.BML_RED_RIGHT
+        if centre == bml.BML_EMPTY:
+            return bml.BML_RED_RIGHT if west == bml.BML_RED_RIGHT else bml.BML_EMPTY
+        return bml.BML_BLUE_DOWN
+    if centre == bml.BML_BLUE_DOWN:
+        return bml.BML_EMPTY if south == bml.BML_EMPTY else bml.BML_BLUE_DOWN
+    if centre == bml.BML_EMPTY:
+        return bml.BML_BLUE_DOWN if north == bml.BML_BLUE_DOWN else bml.BML_EMPTY
+    return bml.BML_RED_RIGHT
+
+
+@pytest.fixture(params=range(len(DENSITIES)))
+def board(request, random_board):
+    return random_board(request.param, DENSITIES[request.param], (bml.BML_RED_RIGHT, bml.BML_BLUE_DOWN))
+
+
+@pytest.mark.parametrize("step", [bml._step_bml_board_np, bml._step_bml_board_jit])
+def test_stepper_matches_cellpylib(step, board, cellpylib_history):
+    history = np.empty((TIMESTEPS,) + board.shape, dtype=np.uint8)
+    history[0] = board
+    for t in range(1, TIMESTEPS):
+        moved = step(history[t - 1], history[t], t % 2 == 1)
+        car = bml.BML_RED_RIGHT if t % 2 == 1 else bml.BML_BLUE_DOWN
+        assert moved == np.count_nonzero((history[t] == car) & (history[t - 1] != car))
+    np.testing.assert_array_equal(history, cellpylib_history(bml_rule, board, TIMESTEPS))
+
+
+@pytest.mark.parametrize("have_numba", [True, False])
+def test_evolve_matches_cellpylib(monkeypatch, have_numba, board, cellpylib_history):
+    monkeypatch.setattr(bml, "HAVE_NUMBA", have_numba)
+    np.testing.assert_array_equal(bml.evolve_bml_board(board, TIMESTEPS),
+                                  cellpylib_history(bml_rule, board, TIMESTEPS))
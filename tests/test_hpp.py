@@ -0,0 +1,90 @@
+"""
+Parity tests for the HPP lattice-gas steppers.
+
+The reference is the original cellpylib rule, so any stepper change that
+drifts from it by a single particle fails here.
+"""
+
+import numpy as np
+import pytest
+
+from framework_led_matrix.core.led_commands import WIDTH, HEIGHT
+from framework_led_matrix.simulations import HardyPomeauPazzis as hpp
+
+TIMESTEPS = 40
+DENSITIES = (0.2, 0.4, 0.6, 0.9)
+
+
+def hpp_collide(state):
+    if state == hpp.NS_COLLIDE:
+        return hpp.WE_COLLIDE
+    if state == hpp.WE_COLLIDE:
+        return hpp.NS_COLLIDE
+    return state
+
+
+def hpp_lga_rule(neighbourhood, c_coord, t):
+    """The original per-cell cellpylib rule."""
+    from_north = hpp_collide(neighbourhood[0, 1]) & hpp.S_PARTICLE
+    from_south = hpp_collide(neighbourhood[2, 1]) & hpp.N_PARTICLE
+    from_east = hpp_collide(neighbourhood[1, 2]) & hpp.W_PARTICLE
+    from_west = hpp_collide(neighbourhood[1, 0]) & hpp.E_PARTICLE
+    return from_north | from_south | from_east | from_west
+
+
+@pytest.fixture(params=range(len(DENSITIES)))
+def board(request, random_board):
+    # Any of the 16 states, so collisions (3 and 12) occur from the start
+    return random_board(request.param, DENSITIES[request.param], range(1, 16))
+
+
+@pytest.fixture
+def expected(board, cellpylib_history):
+    return cellpylib_history(hpp_lga_rule, board, TIMESTEPS)
+
+
+@pytest.mark.parametrize("step, args", [
+    (hpp._step_hpp_board_np, ()),
+    (hpp._step_hpp_board_jit, (hpp.COLLIDE_LUT,)),
+])
+def test_stepper_matches_cellpylib(step, args, board, expected, run_stepper):
+    np.testing.assert_array_equal(run_stepper(step, board, TIMESTEPS, *args), expected)
+
+
+@pytest.mark.parametrize("have_numba", [True, False])
+def test_step_hpp_board_matches_cellpylib(monkeypatch, have_numba, board, expected, run_stepper):
+    monkeypatch.setattr(hpp, "HAVE_NUMBA", have_numba)
+    np.testing.assert_array_equal(run_stepper(hpp.step_hpp_board, board, TIMESTEPS), expected)
+
+
+def test_planes_round_trip(board):
+    out = np.empty_like(board)
+    hpp.unpack_hpp_planes(hpp.pack_hpp_planes(board), out)
+    np.testing.assert_array_equal(out, board)
+
+
+def test_bit_plane_stepper_matches_cellpylib(board, expected):
+    history = np.empty((TIMESTEPS, HEIGHT, WIDTH), dtype=np.uint8)
+    planes = hpp.pack_hpp_planes(board)
+    hpp.unpack_hpp_planes(planes, history[0])
+    for t in range(1, TIMESTEPS):
+        planes = hpp.step_hpp_planes(planes)
+        hpp.unpack_hpp_planes(planes, history[t])
+    np.testing.assert_array_equal(history, expected)
+
+
+@pytest.mark.parametrize("have_numba", [True, False])
+def test_evolve_and_generate_match_cellpylib(monkeypatch, have_numba, board, expected):
+    monkeypatch.setattr(hpp, "HAVE_NUMBA", have_numba)
+    np.testing.assert_array_equal(hpp.evolve_hpp_board(board, TIMESTEPS), expected)
+    frames = list(hpp.generate_hpp_frames(board, TIMESTEPS))
+    assert [i for i, _, _ in frames] == list(range(len(frames)))
+    np.testing.assert_array_equal(np.array([frame for _, frame, _ in frames]), expected[:len(frames)])
+
+
+@pytest.mark.parametrize("have_numba", [True, False])
+def test_generate_stops_once_stable(monkeypatch, have_numba):
+    monkeypatch.setattr(hpp, "HAVE_NUMBA", have_numba)
+    frames = list(hpp.generate_hpp_frames(np.zeros((HEIGHT, WIDTH), dtype=np.uint8), TIMESTEPS))
+    assert len(frames) == 21
+    assert [stable for _, _, stable in frames] == [False] * 20 + [True]
@@ -0,0 +1,55 @@
+"""
+Parity tests for the inner-totalistic (k=2) stepper against the original
+cellpylib implementation.
+"""
+
+import functools
+
+import numpy as np
+import pytest
+
+cpl = pytest.importorskip("cellpylib")
+
+from framework_led_matrix.core.led_commands import WIDTH, HEIGHT
+from framework_led_matrix.simulations import inner_totalistic as it
+
+TIMESTEPS = 20
+RULES = (0, 1, 100, 513, 777, 999, 1023)
+DENSITIES = (0.2, 0.5, 0.8)
+
+
+@functools.lru_cache(maxsize=None)
+def totalistic_rule(rule_number: int):
+    """The original per-cell rule: cellpylib's k=2 totalistic_rule."""
+    return lambda n, c_coord, t: cpl.totalistic_rule(n, k=2, rule=rule_number)
+
+
+@pytest.fixture(params=range(len(DENSITIES)))
+def board(request, random_board):
+    return random_board(request.param, DENSITIES[request.param])
+
+
+@pytest.mark.parametrize("step", [it._step_totalistic_np, it._step_totalistic_jit])
+@pytest.mark.parametrize("rule_number", RULES)
+def test_stepper_matches_cellpylib(step, rule_number, board, cellpylib_history, run_stepper):
+    history = run_stepper(step, board, TIMESTEPS, it.make_totalistic_table(rule_number))
+    np.testing.assert_array_equal(history, cellpylib_history(totalistic_rule(rule_number), board, TIMESTEPS))
+
+
+@pytest.mark.parametrize("have_numba", [True, False])
+@pytest.mark.parametrize("rule_number", RULES)
+def test_run_matches_cellpylib(monkeypatch, have_numba, rule_number, board, cellpylib_history):
+    monkeypatch.setattr(it, "HAVE_NUMBA", have_numba)
+    np.testing.assert_array_equal(it.run_totalistic_ca(board, TIMESTEPS, rule_number),
+                                  cellpylib_history(totalistic_rule(rule_number), board, TIMESTEPS))
+
+
+def test_only_ones_are_live_cells():
+    board = np.random.default_rng(7).integers(0, 4, size=(HEIGHT, WIDTH))
+    np.testing.assert_array_equal(it.run_totalistic_ca(board, 10, 777),
+                                  it.run_totalistic_ca((board == 1).astype(np.uint8), 10, 777))
+
+
+def test_rule_number_out_of_range():
+    with pytest.raises(ValueError):
+        it.make_totalistic_table(1024)
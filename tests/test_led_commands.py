@@ -0,0 +1,91 @@
+"""
+Wire-format tests for led_commands, run against a fake serial port.
+"""
+
+import numpy as np
+import pytest
+import serial
+
+from framework_led_matrix.core import led_commands as lc
+
+PATHS = {'left': '/dev/fake-left', 'right': '/dev/fake-right'}
+
+
+class FakeSerial:
+    """Records every write; raises SerialException on the writes listed in 'fail_on'."""
+    writes = []
+    fail_on = set()
+
+    def __init__(self, path, baudrate, timeout=None, write_timeout=None):
+        self.path = path
+        self.is_open = True
+
+    def write(self, data):
+        FakeSerial.writes.append((self.path, bytes(data)))
+        if len(FakeSerial.writes) in FakeSerial.fail_on:
+            FakeSerial.fail_on.discard(len(FakeSerial.writes))
+            FakeSerial.writes.pop()
+            raise serial.SerialException("device reset")
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        pass
+
+    def read(self, size):
+        return bytes(size)
+
+    def close(self):
+        self.is_open = False
+
+
+@pytest.fixture
+def fake_serial(monkeypatch):
+    FakeSerial.writes = []
+    FakeSerial.fail_on = set()
+    monkeypatch.setattr(lc.serial, "Serial", FakeSerial)
+    monkeypatch.setattr(lc, "get_module_paths", lambda: dict(PATHS))
+    monkeypatch.setattr(lc, "_serial_ports", {})
+    return FakeSerial
+
+
+def test_create_matrix_bit_order():
+    # Cell (row, col) is bit (col + row * WIDTH) of the little-endian payload
+    board = np.random.default_rng(0).integers(0, 2, size=(lc.HEIGHT, lc.WIDTH))
+    expected = bytearray((lc.WIDTH * lc.HEIGHT + 7) // 8)
+    for row in range(lc.HEIGHT):
+        for col in range(lc.WIDTH):
+            if board[row, col] == 1:
+                i = col + row * lc.WIDTH
+                expected[i // 8] |= 1 << (i % 8)
+    assert lc.create_matrix(board) == bytes(expected)
+    assert lc.create_matrix(board.tolist()) == bytes(expected)
+
+
+def test_greyscale_is_sent_as_separate_frames(fake_serial):
+    # The firmware parses one command per read, so each frame is its own write
+    matrix = np.random.default_rng(1).integers(0, 256, size=(lc.HEIGHT, lc.WIDTH))
+    lc.draw_greyscale_on_board(matrix, 'both')
+    frames = [lc._frame(lc.COMMANDS['stagecol'], payload) for payload in lc.create_greyscale_payloads(matrix)]
+    frames.append(lc._frame(lc.COMMANDS['flushcols'], b""))
+    expected = [(path, frame) for path in (PATHS['left'], PATHS['right']) for frame in frames]
+    assert fake_serial.writes == expected
+
+
+def test_retry_resumes_after_the_last_sent_frame(fake_serial):
+    # The 4th write fails once; the batch continues on a reopened port
+    # without resending the 3 frames that already went out
+    fake_serial.fail_on = {4}
+    commands = [(lc.COMMANDS['stagecol'], bytes((col,)) + bytes(lc.HEIGHT)) for col in range(lc.WIDTH)]
+    lc.send_commands(commands, 'left')
+    assert fake_serial.writes == [(PATHS['left'], lc._frame(cmd, params)) for cmd, params in commands]
+
+
+def test_clear_and_fill_payloads(fake_serial):
+    lc.clear_graph()
+    lc.fill_graph()
+    empty = lc.create_matrix(np.zeros((lc.HEIGHT, lc.WIDTH), dtype=np.uint8))
+    full = lc.create_matrix(np.ones((lc.HEIGHT, lc.WIDTH), dtype=np.uint8))
+    assert [frame for _, frame in fake_serial.writes] == [
+        lc._frame(lc.COMMANDS['drawbw'], empty)] * 2 + [lc._frame(lc.COMMANDS['drawbw'], full)] * 2
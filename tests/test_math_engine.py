@@ -0,0 +1,74 @@
+"""
+Regression tests for the vectorised graph sampler.
+
+The reference is the original point-by-point plotting loop, so the
+builders must match it LED for LED for every function in MATH_OPERATIONS.
+"""
+
+import functools
+import warnings
+
+import numpy as np
+import pytest
+
+from framework_led_matrix.core import math_engine as me
+from framework_led_matrix.core.led_commands import WIDTH, HEIGHT
+
+
+def reference_graph(function, xs, horizontal: bool) -> np.ndarray:
+    """The original scalar loop behind create_graph_with_*_x_axis."""
+    matrix = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        warnings.simplefilter('ignore')
+        for x in xs:
+            xf = float(x)
+            y_val = function(xf)
+            if isinstance(y_val, np.ndarray):
+                y_val = y_val.item()
+            y = me.ridiculously_safe_round(y_val)
+            if y == me.unguessable_constant:
+                continue
+            xi = round(xf)
+            if horizontal:
+                if abs(y) <= HEIGHT // 2 - 1 and abs(xi) <= WIDTH // 2:
+                    matrix[17 - y, xi + 4] = 1
+            elif -4 <= y <= 4 and -16 <= xi <= 17:
+                matrix[17 - xi, y + 4] = 1
+    return matrix
+
+
+@functools.lru_cache(maxsize=None)
+def reference_graphs(index: int) -> tuple:
+    function = me.MATH_OPERATIONS[index]
+    return (reference_graph(function, np.arange(-4, 5, 0.01), True),
+            reference_graph(function, np.arange(-16, 17, 0.01), False))
+
+
+@pytest.fixture(autouse=True)
+def quiet(monkeypatch):
+    monkeypatch.setattr(me.log, "verbose", False)
+
+
+def test_sample_grids_are_the_original_aranges():
+    # Bit for bit: slices of the long grid differ in the last few ulps,
+    # which is enough to move points on chaotic functions
+    assert np.array_equal(me._XS_HORIZONTAL, np.arange(-4, 5, 0.01))
+    assert np.array_equal(me._XS_VERTICAL, np.arange(-16, 17, 0.01))
+
+
+@pytest.mark.parametrize("index", range(len(me.MATH_OPERATIONS)))
+def test_graphs_match_the_scalar_loop(index):
+    function = me.MATH_OPERATIONS[index]
+    horizontal, vertical = reference_graphs(index)
+    np.testing.assert_array_equal(me.create_graph_with_horizontal_x_axis(False, function, False), horizontal)
+    np.testing.assert_array_equal(me.create_graph_with_vertical_x_axis(False, function, False), vertical)
+    expected = horizontal if np.count_nonzero(horizontal) >= np.count_nonzero(vertical) else vertical
+    np.testing.assert_array_equal(me.pick_largest_graph(function), expected)
+
+
+def test_pick_largest_graph_returns_a_private_copy():
+    function = me.MATH_OPERATIONS[0]
+    graph = me.pick_largest_graph(function)
+    expected = graph.copy()
+    graph[:] = 1
+    np.testing.assert_array_equal(me.pick_largest_graph(function), expected)
@@ -0,0 +1,98 @@
+"""
+Parity tests for the outer-totalistic (B/S) steppers.
+
+The reference is the original cellpylib rule, so any stepper change that
+drifts from it by a single cell fails here.
+"""
+
+import functools
+
+import numpy as np
+import pytest
+
+from framework_led_matrix.core.led_commands import WIDTH, HEIGHT
+from framework_led_matrix.simulations import outer_totalistic as ot
+
+TIMESTEPS = 30
+DENSITIES = (0.15, 0.35, 0.5, 0.75)
+RULE_NAMES = sorted(ot.NAMED_RULES)
+
+
+@functools.lru_cache(maxsize=None)
+def outer_totalistic_rule(rule_name: str):
+    """The original per-cell cellpylib rule for one named B/S rule."""
+    b_rule, s_rule = ot.NAMED_RULES[rule_name]
+    b_set, s_set = set(b_rule), set(s_rule)
+
+    def rule(neighbourhood, c_coord, t):
+        centre = neighbourhood[1, 1]
+        neighbour_sum = np.sum(neighbourhood) - centre
+        if centre == 1:
+            return 1 if neighbour_sum in s_set else 0
+        return 1 if neighbour_sum in b_set else 0
+    return rule
+
+
+@pytest.fixture(params=range(len(DENSITIES)))
+def board(request, random_board):
+    return random_board(request.param, DENSITIES[request.param])
+
+
+@pytest.mark.parametrize("step", [ot._step_outer_totalistic_np, ot._step_outer_totalistic_jit])
+@pytest.mark.parametrize("rule_name", RULE_NAMES)
+def test_stepper_matches_cellpylib(step, rule_name, board, cellpylib_history, run_stepper):
+    birth, survive = ot.make_rule_tables(*ot.NAMED_RULES[rule_name])
+    np.testing.assert_array_equal(run_stepper(step, board, TIMESTEPS, birth, survive),
+                                  cellpylib_history(outer_totalistic_rule(rule_name), board, TIMESTEPS))
+
+
+@pytest.mark.parametrize("rule_name", RULE_NAMES)
+def test_bitboard_stepper_matches_cellpylib(rule_name, board, cellpylib_history):
+    b_rule, s_rule = ot.NAMED_RULES[rule_name]
+    history = np.empty((TIMESTEPS, HEIGHT, WIDTH), dtype=np.uint8)
+    bb = ot.pack_board(board)
+    ot.unpack_board(bb, history[0])
+    for t in range(1, TIMESTEPS):
+        bb = ot.step_outer_totalistic_bits(bb, tuple(b_rule), tuple(s_rule))
+        ot.unpack_board(bb, history[t])
+    np.testing.assert_array_equal(history, cellpylib_history(outer_totalistic_rule(rule_name), board, TIMESTEPS))
+
+
+@pytest.mark.parametrize("have_numba", [
+    pytest.param(True, marks=pytest.mark.skipif(not ot.HAVE_NUMBA, reason="Numba is not installed")),
+    False,
+])
+def test_run_matches_cellpylib(monkeypatch, have_numba, board, cellpylib_history):
+    # Without Numba run_outer_totalistic_ca steps bitboards
+    monkeypatch.setattr(ot, "HAVE_NUMBA", have_numba)
+    np.testing.assert_array_equal(ot.run_outer_totalistic_ca(board, TIMESTEPS, *ot.NAMED_RULES["Life"]),
+                                  cellpylib_history(outer_totalistic_rule("Life"), board, TIMESTEPS))
+
+
+@pytest.mark.parametrize("have_numba", [True, False])
+def test_only_ones_are_live_cells(monkeypatch, have_numba):
+    monkeypatch.setattr(ot, "HAVE_NUMBA", have_numba)
+    board = np.random.default_rng(7).integers(0, 4, size=(HEIGHT, WIDTH))
+    history = ot.run_outer_totalistic_ca(board, 10, [3], [2, 3])
+    expected = ot.run_outer_totalistic_ca((board == 1).astype(np.uint8), 10, [3], [2, 3])
+    np.testing.assert_array_equal(history, expected)
+
+
+@pytest.mark.parametrize("step", [ot._step_outer_totalistic_np, ot._step_outer_totalistic_jit])
+@pytest.mark.parametrize("rule_name", RULE_NAMES)
+def test_every_state_and_neighbour_count(step, rule_name):
+    # Covers all 18 (alive, count) entries of the rule, including counts
+    # that random boards rarely reach
+    b_rule, s_rule = ot.NAMED_RULES[rule_name]
+    birth, survive = ot.make_rule_tables(b_rule, s_rule)
+    r, c = HEIGHT // 2, WIDTH // 2
+    for alive in (0, 1):
+        for count in range(9):
+            board = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+            board[r, c] = alive
+            for dr, dc in ot._MOORE_OFFSETS[:count]:
+                board[r + dr, c + dc] = 1
+            out = np.empty_like(board)
+            step(board, out, birth, survive)
+            expected = count in (s_rule if alive else b_rule)
+            assert out[r, c] == expected, (alive, count)
@@ -0,0 +1,100 @@
+"""
+Tests for the cached text renderers.
+
+The reference is the original per-pixel getpixel mapping, so the NumPy
+blit, the shared font-fit and the render cache must not move a pixel.
+"""
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from framework_led_matrix.core.led_commands import WIDTH, HEIGHT
+from framework_led_matrix.utils import text_rendering as tr
+
+WORDS = ("a", "hi", "hello", "anagram", "Wg|", "abcdefghijklmn")
+FONT_SIZES = (None, 4, 7, 10, 20)
+
+
+def load_font(size):
+    try:
+        return ImageFont.truetype(tr.DEFAULT_FONT_PATH, size)
+    except IOError:
+        return ImageFont.load_default()
+
+
+def fit(text, font_size, fits):
+    font = load_font(font_size)
+    _, _, text_width, text_height = font.getbbox(text)
+    while not fits(text_width, text_height) and font_size > 1:
+        font_size -= 1
+        font = load_font(font_size)
+        _, _, text_width, text_height = font.getbbox(text)
+    image = Image.new('1', (text_width, text_height), 0)
+    ImageDraw.Draw(image).text((0, 0), text, font=font, fill=1)
+    return image, text_width, text_height
+
+
+def reference_vertical(text, font_size, row_offset):
+    """The original get_matrix_from_text_vertical mapping."""
+    font_size = tr.get_font_size(len(text)) if font_size is None else font_size
+    image, text_width, text_height = fit(text, font_size, lambda w, h: h <= WIDTH and w <= HEIGHT - row_offset)
+    matrix = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    col_offset = (WIDTH - text_height) // 2
+    for x in range(text_width):
+        for y in range(text_height):
+            row, col = (text_width - 1 - x) + row_offset, col_offset + y
+            if 0 <= row < HEIGHT and 0 <= col < WIDTH:
+                matrix[row, col] = image.getpixel((x, y))
+    return matrix
+
+
+def reference_horizontal(text, font_size, x_offset, y_offset):
+    """The original get_matrix_from_text_horizontal mapping."""
+    font_size = tr.get_font_size(len(text)) if font_size is None else font_size
+    image, text_width, text_height = fit(text, font_size, lambda w, h: h <= HEIGHT)
+    matrix = np.zeros((HEIGHT, WIDTH), dtype=np.uint8)
+    if y_offset == 0:
+        y_offset = (HEIGHT - text_height) // 2
+    for col in range(WIDTH):
+        for row in range(HEIGHT):
+            x, y = col + x_offset, row - y_offset
+            if 0 <= x < text_width and 0 <= y < text_height:
+                matrix[row, col] = image.getpixel((x, y))
+    return matrix
+
+
+@pytest.fixture(autouse=True)
+def no_hardware(monkeypatch):
+    sent = []
+    monkeypatch.setattr(tr, "draw_matrix_on_board", lambda matrix, which='both': sent.append(np.array(matrix)))
+    return sent
+
+
+@pytest.mark.parametrize("text", WORDS)
+@pytest.mark.parametrize("font_size", FONT_SIZES)
+@pytest.mark.parametrize("offset", (0, 3, -2, 10))
+def test_renderers_match_the_getpixel_mapping(text, font_size, offset):
+    np.testing.assert_array_equal(tr.get_matrix_from_text_vertical(text, font_size, offset),
+                                  reference_vertical(text, font_size, offset))
+    np.testing.assert_array_equal(tr.get_matrix_from_text_horizontal(text, font_size, offset, offset),
+                                  reference_horizontal(text, font_size, offset, offset))
+
+
+def test_draw_sends_and_returns_the_rendered_matrix(no_hardware):
+    vertical = tr.draw_text_vertical("hello", which='left', row_offset=2)
+    horizontal = tr.draw_text_horizontal("hi", which='right', x_offset=1)
+    np.testing.assert_array_equal(vertical, tr.get_matrix_from_text_vertical("hello", row_offset=2))
+    np.testing.assert_array_equal(horizontal, tr.get_matrix_from_text_horizontal("hi", x_offset=1))
+    np.testing.assert_array_equal(no_hardware[0], vertical)
+    np.testing.assert_array_equal(no_hardware[1], horizontal)
+
+
+def test_callers_cannot_change_the_cached_render():
+    matrix = tr.draw_text_vertical("cache")
+    expected = matrix.copy()
+    matrix[:] = 1
+    np.testing.assert_array_equal(tr.draw_text_vertical("cache"), expected)
+    tr.get_matrix_from_text_horizontal("cache")[:] = 1
+    np.testing.assert_array_equal(tr.get_matrix_from_text_horizontal("cache"),
+                                  reference_horizontal("cache", None, 0, 0))